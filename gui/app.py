@@ -8,14 +8,24 @@ import pandas as pd
 
 from gui.ui.layout import build_layout
 from gui.core.presets import load_presets, apply_preset
-from gui.core.formula_engine import evaluate_formula
-from gui.core.exporter import export_to_excel
+from gui.core.formula_engine import preview_sample, result_cache, PREVIEW_DEBOUNCE_MS
+from gui.core.formula_graph import ColumnResults, preview_column, downstream
+from gui.core.exporter import export_to_excel, required_columns, active_formulas
+from gui.core.background import run_in_background
+from gui.core.preview_scheduler import PreviewScheduler
+from gui.core.loader import PROBE_ROWS, FILE_TYPES, load_reference_sheet
+from gui.core.readers import calibrate, is_calibrated
+from gui.core.workbook_cache import WorkbookCache, DEFAULT_BUDGET_MB, file_signature
+from gui.core.compactor import compact_frame, format_bytes
+from gui.core.disk_cache import content_hash, SheetDiskCache, CACHE_DIR, DEFAULT_MAX_MB, DEFAULT_MAX_AGE_DAYS
 
 # alias imported helpers to avoid name-clash with our class methods
 from gui.core.config_manager import (
     save_config as cfg_save,
     load_config as cfg_load,
     list_recent,
+    get_setting,
+    set_setting,
 )
 
 
@@ -32,14 +42,67 @@ class ExcelTransformerApp:
         # state
         self.df = None
         self.ref_df = None
+        self.ref_path = None
+        # projected reference frames: (content hash, sheet) -> list of DataFrames
+        self.ref_frames: dict[tuple, list] = {}
         self.file_path = None
+        self.df_is_sample = False   # True while self.df only holds the probe rows
+        self.loaded_sheet = None    # (sheet name, header row) behind self.df
+        # columns read for the last export: ((file signature, loaded_sheet), DataFrame)
+        self.projected_frame = None
+        self.export_pending = False  # an export waits for the running full load
         self.header_row = tk.IntVar(value=0)
+        # shrink dtypes of the fully loaded sheet (see core/compactor.py)
+        self.compact_dtypes = tk.BooleanVar(value=get_setting("compact_dtypes", False))
+        self.compact_dtypes.trace_add(
+            "write", lambda *_: set_setting("compact_dtypes", self.compact_dtypes.get())
+        )
+        self.fail_fast = tk.BooleanVar(value=get_setting("formula_fail_fast", False))
+        self.fail_fast.trace_add(
+            "write", lambda *_: set_setting("formula_fail_fast", self.fail_fast.get())
+        )
+        # skip the full load; exports read only the columns they use
+        self.defer_full_load = tk.BooleanVar(value=get_setting("defer_full_load", False))
+        self.defer_full_load.trace_add(
+            "write", lambda *_: set_setting("defer_full_load", self.defer_full_load.get())
+        )
+        # typed into an entry, so saved on focus-out / export rather than per keystroke
+        self.extra_formats = tk.StringVar(value=get_setting("export_extra_formats", ""))
+
+        # in-flight background loads, keyed by slot ("main", "full", "ref", "export", ...)
+        self.load_tasks = {}
+
+        # parsed sheets persisted between sessions (Feather sidecar files)
+        self.disk_cache = SheetDiskCache(
+            cache_dir=get_setting("disk_cache_dir", CACHE_DIR),
+            max_bytes=int(get_setting("disk_cache_mb", DEFAULT_MAX_MB)) * 1024 ** 2,
+            max_age_days=float(get_setting("disk_cache_max_age_days", DEFAULT_MAX_AGE_DAYS)),
+        )
+        self.disk_cache.evict()
+
+        # parsed sheet grids, reused across sheet switches / header changes
+        budget_mb = get_setting("session_cache_mb", DEFAULT_BUDGET_MB)
+        self.workbook_cache = WorkbookCache(
+            max_bytes=int(budget_mb) * 1024 ** 2, disk_cache=self.disk_cache
+        )
 
         # UI‐bound dicts
         self.column_vars: dict[str, tk.BooleanVar] = {}
         self.formula_vars: dict[str, tk.StringVar] = {}
         self.preview_labels: dict[str, tk.Label] = {}
 
+        # debounced previews: pending after() ids per column + the cached sample
+        self.preview_jobs: dict[str, str] = {}
+        self._preview_results = None  # ColumnResults over the preview sample
+        self._preview_source = None
+        # computed formula columns of the last export, reused when unchanged
+        self.export_results = None
+        # previews are evaluated on one worker thread, newest text per column wins
+        self.preview_scheduler = PreviewScheduler(
+            self.root, preview_column, self._show_formula_preview,
+            on_idle=self._report_preview_latency,
+        )
+
         # presets + recent configs
         self.presets_path = "presets.json"
         self.presets = load_presets(self.presets_path)
@@ -48,28 +111,68 @@ class ExcelTransformerApp:
         # build GUI
         build_layout(self)
 
+        # benchmark the installed Excel readers once; the choice is saved in app_settings.json
+        if not is_calibrated():
+            run_in_background(
+                self.root, calibrate,
+                on_done=lambda results: self.update_status(
+                    "Reader calibrated: " + ", ".join(
+                        f"{ext} -> {min(t, key=t.get)}" for ext, t in results.items()
+                    )
+                ),
+                on_error=lambda exc: None,
+            )
+
     # ------------------------------------------------------------------ #
     # File + sheet handling                                              #
     # ------------------------------------------------------------------ #
     def load_main_file(self) -> None:
-        path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx *.xls")])
+        path = filedialog.askopenfilename(filetypes=FILE_TYPES)
         if not path:
             return
         self.file_path = path
-        xls = pd.ExcelFile(path)
-        self.sheet_dropdown.configure(values=xls.sheet_names)
+        self._cancel_slot("full")
+        self._cancel_slot("prefetch")
+        self.workbook_cache.stop_prefetch()
+        self._start_load(
+            "main", f"Opening {os.path.basename(path)}...",
+            self.workbook_cache.sheet_names, path,
+            on_done=self._on_sheet_names,
+        )
+
+    def _on_sheet_names(self, sheet_names):
+        self.sheet_dropdown.configure(values=sheet_names)
         self.sheet_dropdown.current(0)
         self.load_sheet()
 
     def load_sheet(self, *_):
+        if not self.file_path:
+            return
         sheet_name = self.sheet_dropdown.get()
-        self.df = pd.read_excel(
-            self.file_path,
-            sheet_name=sheet_name,
-            header=self.header_row.get(),
+        header_row = self.header_row.get()
+        self.loaded_sheet = (sheet_name, header_row)
+        self.projected_frame = None
+        self.export_pending = False
+        self._cancel_slot("full")
+        self._cancel_slot("export")
+        # phase 1: header + a few rows so the column controls appear quickly
+        self._start_load(
+            "main", f"Loading sheet '{sheet_name}'...",
+            self.workbook_cache.probe_sheet, self.file_path, sheet_name, header_row,
+            get_setting("probe_rows", PROBE_ROWS),
+            on_done=self._on_sheet_probed,
         )
 
+    def _on_sheet_probed(self, probe):
+        df, complete = probe
+        self.df = df
+        self.df_is_sample = not complete
+
         # clear old widgets/vars
+        for job in self.preview_jobs.values():
+            self.root.after_cancel(job)
+        self.preview_jobs.clear()
+        self.preview_scheduler.cancel()
         self.column_vars.clear()
         self.formula_vars.clear()
         self.preview_labels.clear()
@@ -80,6 +183,144 @@ class ExcelTransformerApp:
         for col in self.df.columns:
             self.add_column_row(col)
 
+        if complete:
+            self.update_status(f"Loaded {len(df):,} rows x {len(df.columns)} columns", success=True)
+            self._prefetch_other_sheets()
+        elif self.defer_full_load.get():
+            self.update_status(f"{len(df.columns)} columns (sample rows only; full data loads at export)")
+        else:
+            # phase 2: the full sheet, while the user configures formulas
+            self._start_load(
+                "full", f"{len(df.columns)} columns ready, loading all rows...",
+                self._read_full_sheet, self.file_path, *self.loaded_sheet, self.compact_dtypes.get(),
+                on_done=self._on_sheet_loaded,
+            )
+
+    def _read_full_sheet(self, path, sheet_name, header_row, compact):
+        """Worker side of the full load; returns ``(df, (bytes before, after) or None)``."""
+        df = self.workbook_cache.load_sheet(path, sheet_name, header_row)
+        if not compact:
+            return df, None
+        df, before, after = compact_frame(df)
+        return df, (before, after)
+
+    def _on_sheet_loaded(self, loaded):
+        df, sizes = loaded
+        self.df = df
+        self.df_is_sample = False
+        for col, f_var in self.formula_vars.items():
+            if f_var.get().strip():
+                self.update_formula_preview(col)
+        message = f"Loaded {len(df):,} rows x {len(df.columns)} columns"
+        if sizes:
+            message += f" (compacted {format_bytes(sizes[0])} -> {format_bytes(sizes[1])})"
+        self.update_status(message, success=True)
+        self._prefetch_other_sheets()
+        if self.export_pending:
+            self.export_pending = False
+            self._export_loaded(df)
+
+    def _prefetch_other_sheets(self):
+        """Parse the remaining sheets in a process pool so switching is instant."""
+        if not get_setting("prefetch_sheets", True) or "prefetch" in self.load_tasks:
+            return
+        current = self.sheet_dropdown.get()
+        others = [s for s in self.sheet_dropdown.cget("values") if s != current]
+        if not others:
+            return
+        self.load_tasks["prefetch"] = run_in_background(
+            self.root, self.workbook_cache.prefetch, self.file_path, others,
+            get_setting("parse_workers"),
+            on_done=self._on_prefetched,
+            on_error=lambda exc: self.update_status(f"Sheet prefetch failed: {exc}"),
+        )
+
+    def _on_prefetched(self, timings):
+        if timings:
+            slowest = max(timings, key=timings.get)
+            self.update_status(
+                f"Parsed {len(timings)} more sheets in parallel "
+                f"(slowest: '{slowest}', {timings[slowest]:.1f}s)"
+            )
+
+    def _export_frame(self):
+        """Start getting the data an export needs; the export continues in ``_export_loaded``.
+
+        A fully loaded sheet is used as-is and a running full load is waited
+        for; otherwise only the columns the export uses are read, in the
+        background, and kept for the next export of the same sheet.
+        """
+        if self.df is None or not self.df_is_sample:
+            self._export_loaded(self.df)
+            return
+        task = self.load_tasks.get("full")
+        if task is not None and task.active:
+            # the full sheet is on its way; parsing the columns again would only compete with it
+            self.export_pending = True
+            self.update_status("Export starts when all rows are loaded...")
+            return
+        columns = required_columns(
+            self.df.columns, self.column_vars, self.formula_vars, self.main_key_entry.get()
+        )
+        source = (file_signature(self.file_path), self.loaded_sheet)
+        if self.projected_frame is not None:
+            kept_source, kept = self.projected_frame
+            if kept_source == source and set(columns) <= set(kept.columns):
+                self._export_loaded(kept)
+                return
+        self._start_load(
+            "export", f"Reading {len(columns)} of {len(self.df.columns)} columns for export...",
+            self.workbook_cache.load_columns, self.file_path, *self.loaded_sheet, columns,
+            on_done=lambda frame: self._on_export_columns(source, frame),
+        )
+
+    def _on_export_columns(self, source, frame):
+        self.load_tasks.pop("export", None)
+        self.projected_frame = (source, frame)
+        self._export_loaded(frame)
+
+    # ------------------------------------------------------------------ #
+    # Background loading                                                 #
+    # ------------------------------------------------------------------ #
+    def _start_load(self, slot, message, fn, *args, on_done):
+        """Run a loader in the background, replacing any load in *slot*."""
+        self._cancel_slot(slot)
+        self.update_status(message)
+        self.load_tasks[slot] = run_in_background(
+            self.root, fn, *args, on_done=on_done, on_error=self._on_load_error
+        )
+
+    def _cancel_slot(self, slot):
+        task = self.load_tasks.pop(slot, None)
+        if task is not None:
+            task.cancel()
+
+    def cancel_load(self):
+        cancelled = False
+        for task in self.load_tasks.values():
+            if task.active:
+                task.cancel()
+                cancelled = True
+        self.load_tasks.clear()
+        self.export_pending = False
+        self.workbook_cache.stop_prefetch()
+        if cancelled:
+            self.update_status("Load cancelled")
+
+    def _on_load_error(self, exc):
+        self.export_pending = False
+        self.update_status("Load failed", success=False)
+        messagebox.showerror("Load Error", f"Could not load file:\n{exc}")
+
+    def purge_cache(self):
+        """Drop the on-disk sheet cache and the in-memory sheet / formula result caches."""
+        if not messagebox.askyesno("Clear Cache", "Delete all cached sheets?"):
+            return
+        freed = self.disk_cache.purge()
+        self.workbook_cache.clear()
+        result_cache.clear()
+        messagebox.showinfo("Cache Cleared", f"Freed {freed / 1024 ** 2:.1f} MB of cached sheets.")
+
     # ------------------------------------------------------------------ #
     # Dynamic column-row creation                                        #
     # ------------------------------------------------------------------ #
@@ -94,7 +335,7 @@ class ExcelTransformerApp:
         f_var = tk.StringVar()
         entry = tk.Entry(row, textvariable=f_var, width=35)
         entry.grid(row=0, column=1, padx=4, sticky="ew")
-        entry.bind("<KeyRelease>", lambda _e, c=col: self.update_formula_preview(c))
+        f_var.trace_add("write", lambda *_, c=col: self.update_formula_preview(c))
         self.formula_vars[col] = f_var
 
         preview = tk.Label(row, text="", font=("Consolas", 9), fg="gray")
@@ -107,8 +348,51 @@ class ExcelTransformerApp:
     # Formula preview + presets                                          #
     # ------------------------------------------------------------------ #
     def update_formula_preview(self, col: str) -> None:
-        result = evaluate_formula(self.df, col, self.formula_vars[col].get().strip())
-        self.preview_labels[col].config(text=result)
+        """Schedule a preview once typing in *col* has paused."""
+        job = self.preview_jobs.pop(col, None)
+        if job is not None:
+            self.root.after_cancel(job)
+        self.preview_jobs[col] = self.root.after(
+            PREVIEW_DEBOUNCE_MS, self._run_formula_preview, col
+        )
+
+    def _run_formula_preview(self, col: str) -> None:
+        self.preview_jobs.pop(col, None)
+        if col not in self.formula_vars:
+            return  # the column rows were rebuilt in the meantime
+        # formulas may read other formula columns, so their previews change too
+        formulas = active_formulas(self.formula_vars)
+        results = self._sample_results()
+        for c in [col] + downstream(formulas, col):
+            self.preview_scheduler.submit(c, results, formulas, c)
+
+    def _show_formula_preview(self, col, result, args):
+        f_var = self.formula_vars.get(col)
+        label = self.preview_labels.get(col)
+        if f_var is None or label is None:
+            return
+        _, formulas, _ = args
+        if f_var.get().strip() == formulas.get(col, ""):  # drop the result if newer text arrived
+            label.config(text=result)
+
+    def _report_preview_latency(self):
+        stats = self.preview_scheduler.stats()
+        if stats["count"]:
+            self.update_status(
+                f"Preview latency p50 {stats['p50_ms']:.0f} ms, p95 {stats['p95_ms']:.0f} ms "
+                f"({stats['count']} previews, {stats['dropped']} superseded)"
+            )
+
+    def _sample_results(self):
+        """Formula results over a fixed preview sample of self.df.
+
+        Rebuilt only when self.df changes; otherwise columns whose formula
+        (and inputs) are unchanged are not recomputed.
+        """
+        if self._preview_source is not self.df:
+            self._preview_source = self.df
+            self._preview_results = ColumnResults(preview_sample(self.df))
+        return self._preview_results
 
     def apply_preset(self):
         apply_preset(
@@ -123,13 +407,82 @@ class ExcelTransformerApp:
     # Reference file load / export                                       #
     # ------------------------------------------------------------------ #
     def load_reference_file(self):
-        path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx *.xls")])
+        path = filedialog.askopenfilename(filetypes=FILE_TYPES)
         if path:
-            self.ref_df = pd.read_excel(path)
+            self.ref_path = path
+            self.ref_df = None
+            # only list the sheets; the data is read at export with the join projection
+            self._start_load(
+                "ref", f"Opening reference {os.path.basename(path)}...",
+                self.workbook_cache.sheet_names, path,
+                on_done=self._on_reference_sheets,
+            )
+
+    def _on_reference_sheets(self, sheet_names):
+        self.ref_sheet_dropdown.configure(values=sheet_names)
+        self.ref_sheet_dropdown.current(0)
+        self.update_status(f"Reference file: {os.path.basename(self.ref_path)}", success=True)
+
+    def _reference_request(self):
+        """(path, sheet, key, columns) of the reference data to join, or None."""
+        ref_key = self.ref_key_entry.get().strip()
+        ref_cols = [c.strip() for c in self.ref_cols_entry.get().split(",") if c.strip()]
+        if not self.ref_path or not ref_key or not ref_cols:
+            return None
+        return self.ref_path, self.ref_sheet_dropdown.get() or 0, ref_key, ref_cols
+
+    def _read_reference(self, path, sheet_name, ref_key, ref_cols):
+        """Worker side: the reference data restricted to the join key + ref columns.
+
+        Frames are kept per file content hash, so re-exporting against an
+        unchanged reference file skips the read; the disk cache carries them
+        across sessions.
+        """
+        frames = self.ref_frames.setdefault((content_hash(path), sheet_name), [])
+        wanted = {ref_key, *ref_cols}
+        for frame in frames:
+            if wanted <= set(frame.columns):
+                return frame
+        frame = load_reference_sheet(
+            path, sheet_name, ref_key, ref_cols, cache=self.workbook_cache.disk_cache_for(path),
+        )
+        frames.append(frame)
+        return frame
 
     def export(self):
+        # hashing and reading the reference file can take a while on big files,
+        # so it runs in the background ("Cancel" stops it) and the export
+        # continues once it is done
+        request = self._reference_request()
+        if request is None:
+            self._export_with_reference(None)
+            return
+        self._cancel_slot("ref")
+        self.update_status(f"Reading reference columns: {', '.join(sorted({request[2], *request[3]}))}")
+        self.load_tasks["ref"] = run_in_background(
+            self.root, self._read_reference, *request,
+            on_done=self._export_with_reference,
+            on_error=lambda exc: messagebox.showerror(
+                "Reference Error", f"Could not read the reference file:\n{exc}"
+            ),
+        )
+
+    def _export_with_reference(self, ref_df):
+        self.load_tasks.pop("ref", None)
+        self.ref_df = ref_df
+        try:
+            self._export_frame()
+        except Exception as exc:
+            self.update_status("Export failed", success=False)
+            messagebox.showerror("Load Error", f"Could not read the data to export:\n{exc}")
+
+    def _export_loaded(self, frame):
+        """Evaluate the formulas over *frame* and write the export."""
+        if self.export_results is None or self.export_results.frame is not frame:
+            self.export_results = ColumnResults(frame, progress=self._report_rowwise_progress)
+        self.export_results.fail_fast = self.fail_fast.get()
         export_to_excel(
-            self.df,
+            frame,
             self.column_vars,
             self.formula_vars,
             self.ref_df,
@@ -137,8 +490,21 @@ class ExcelTransformerApp:
             self.ref_key_entry.get(),
             self.ref_cols_entry.get(),
             self.file_path,
+            results=self.export_results,
+            status=self.update_status,
+            extra_formats=self.save_extra_formats(),
         )
 
+    def save_extra_formats(self, *_):
+        """Store the "Also save as" formats if they changed; returns them."""
+        value = self.extra_formats.get()
+        if value != get_setting("export_extra_formats", ""):
+            set_setting("export_extra_formats", value)
+        return value
+
+    def _report_rowwise_progress(self, col, done, total):
+        self.update_status(f"Evaluating '{col}' row by row: {done}/{total} partitions")
+
     # ------------------------------------------------------------------ #
     # Config save / load                                                 #
     # ------------------------------------------------------------------ #
@@ -0,0 +1,73 @@
+# core/background.py
+"""Run slow work off the Tk main thread and hand results back via root.after."""
+
+import threading
+from concurrent.futures import Future, CancelledError
+
+POLL_MS = 50
+
+
+class BackgroundTask:
+    """A cancellable unit of work running on a daemon thread.
+
+    ``cancel()`` prevents a queued task from starting; a task that is already
+    running cannot be interrupted (the Excel readers have no hook for it), so
+    its result is discarded instead and the callbacks never fire.
+    """
+
+    def __init__(self, root, fn, args=(), kwargs=None, on_done=None, on_error=None):
+        self.root = root
+        self.future: Future = Future()
+        self._fn = fn
+        self._args = args
+        self._kwargs = kwargs or {}
+        self._on_done = on_done
+        self._on_error = on_error
+        self._cancelled = False
+
+    def start(self) -> "BackgroundTask":
+        # daemon thread so closing the window never waits on a stuck parse
+        threading.Thread(target=self._run, daemon=True).start()
+        self.root.after(POLL_MS, self._poll)
+        return self
+
+    def _run(self) -> None:
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = self._fn(*self._args, **self._kwargs)
+        except BaseException as exc:
+            self.future.set_exception(exc)
+        else:
+            self.future.set_result(result)
+
+    def _poll(self) -> None:
+        # Tk is not thread-safe, so callbacks always run here on the UI thread
+        if self._cancelled:
+            return
+        if not self.future.done():
+            self.root.after(POLL_MS, self._poll)
+            return
+        try:
+            result = self.future.result()
+        except CancelledError:
+            return
+        except Exception as exc:
+            if self._on_error:
+                self._on_error(exc)
+            return
+        if self._on_done:
+            self._on_done(result)
+
+    def cancel(self) -> None:
+        self._cancelled = True
+        self.future.cancel()
+
+    @property
+    def active(self) -> bool:
+        return not self._cancelled and not self.future.done()
+
+
+def run_in_background(root, fn, *args, on_done=None, on_error=None, **kwargs) -> BackgroundTask:
+    """Start *fn(*args, **kwargs)* in the background and return its task."""
+    return BackgroundTask(root, fn, args, kwargs, on_done, on_error).start()
@@ -0,0 +1,106 @@
+# core/compactor.py
+"""Shrink loaded DataFrames: downcast numbers, categorise repeats, Arrow-back text."""
+
+import numpy as np
+import pandas as pd
+
+from gui.core.readers import HAVE_ARROW
+
+CATEGORY_RATIO = 0.5        # unique / non-null at or below this → category
+MAX_CATEGORIES = 100_000
+
+
+def frame_bytes(df) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _arrow_string_dtype():
+    try:
+        return pd.StringDtype("pyarrow", na_value=np.nan)  # pandas >= 2.3
+    except TypeError:
+        return pd.StringDtype("pyarrow")
+
+
+def _compact_numeric(s):
+    if pd.api.types.is_bool_dtype(s):
+        return s
+    if pd.api.types.is_integer_dtype(s):
+        return pd.to_numeric(s, downcast="integer")
+    if s.dtype == np.float64:
+        narrow = s.astype(np.float32)
+        # only when every value survives the round trip exactly
+        if np.array_equal(narrow.to_numpy(np.float64), s.to_numpy(), equal_nan=True):
+            return narrow
+    return s
+
+
+def _compact_text(s, category_ratio, max_categories):
+    values = s.dropna()
+    if values.empty or not all(isinstance(v, str) for v in values):
+        return s  # mixed object columns keep their Python objects
+    n_unique = values.nunique()
+    if n_unique <= max_categories and n_unique <= category_ratio * len(values):
+        return s.astype("category")
+    if HAVE_ARROW:
+        return s.astype(_arrow_string_dtype())
+    return s
+
+
+def compact_frame(df, category_ratio=CATEGORY_RATIO, max_categories=MAX_CATEGORIES):
+    """Return ``(compacted df, bytes before, bytes after)``.
+
+    Integers go to the smallest type that holds them, float64 → float32 only
+    when lossless, low-cardinality strings → ``category`` and other strings →
+    Arrow-backed storage (when pyarrow is installed).  Formulas still see the
+    original dtypes through ``widen_for_eval``.
+    """
+    before = frame_bytes(df)
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_numeric_dtype(s):
+            out[col] = _compact_numeric(s)
+        elif s.dtype == object or pd.api.types.is_string_dtype(s):
+            out[col] = _compact_text(s, category_ratio, max_categories)
+        else:
+            out[col] = s
+    compacted = pd.DataFrame(out, index=df.index)
+    compacted.columns = df.columns
+    return compacted, before, frame_bytes(compacted)
+
+
+def widen_for_eval(df, columns):
+    """Return *df* with the given *columns* restored to 64-bit / plain dtypes.
+
+    Keeps formula arithmetic from overflowing narrow integers and lets string
+    concatenation work on categoricals.  Only the referenced columns are
+    copied; everything else is shared with *df*.
+    """
+    widened = {}
+    for col in columns:
+        if col not in df.columns:
+            continue
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            widened[col] = s.astype(s.cat.categories.dtype)
+        elif pd.api.types.is_bool_dtype(s):
+            continue
+        elif pd.api.types.is_signed_integer_dtype(s) and s.dtype.itemsize < 8:
+            widened[col] = s.astype(np.int64)
+        elif pd.api.types.is_unsigned_integer_dtype(s):
+            widened[col] = s.astype(np.int64) if s.dtype.itemsize < 8 else s
+        elif s.dtype == np.float32:
+            widened[col] = s.astype(np.float64)
+    if not widened:
+        return df
+    df = df.copy(deep=False)
+    for col, s in widened.items():
+        df[col] = s
+    return df
+
+
+def format_bytes(n) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
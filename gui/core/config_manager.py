@@ -3,31 +3,48 @@
 
 import json
 import os
+import tempfile
+import threading
 
 MAX_RECENT = 8          # how many recent files to remember
 SETTINGS_FILE = "app_settings.json"
 
+# background tasks (e.g. reader calibration) save settings too; every
+# read-modify-write of the file happens under this lock
+_settings_lock = threading.RLock()
+
 
 def _load_settings():
-    if os.path.exists(SETTINGS_FILE):
-        with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+    with _settings_lock:
+        if os.path.exists(SETTINGS_FILE):
+            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
 
 
 def _save_settings(settings: dict):
-    with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-        json.dump(settings, f, indent=2)
+    # write a temporary file and swap it in, so a reader never sees half a file
+    folder = os.path.dirname(os.path.abspath(SETTINGS_FILE))
+    with _settings_lock:
+        fd, tmp = tempfile.mkstemp(prefix=".settings-", suffix=".tmp", dir=folder)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(settings, f, indent=2)
+            os.replace(tmp, SETTINGS_FILE)
+        except BaseException:
+            os.unlink(tmp)
+            raise
 
 
 def _touch_recent(path: str):
-    settings = _load_settings()
-    recent = settings.get("recent_configs", [])
-    if path in recent:
-        recent.remove(path)
-    recent.insert(0, path)
-    settings["recent_configs"] = recent[:MAX_RECENT]
-    _save_settings(settings)
+    with _settings_lock:
+        settings = _load_settings()
+        recent = settings.get("recent_configs", [])
+        if path in recent:
+            recent.remove(path)
+        recent.insert(0, path)
+        settings["recent_configs"] = recent[:MAX_RECENT]
+        _save_settings(settings)
 
 
 def save_config(config: dict, path: str):
@@ -48,3 +65,16 @@ def load_config(path: str) -> dict:
 def list_recent() -> list[str]:
     """Return most-recent-used config paths (newest first)."""
     return _load_settings().get("recent_configs", [])
+
+
+def get_setting(key: str, default=None):
+    """Return a single value from the app settings file."""
+    return _load_settings().get(key, default)
+
+
+def set_setting(key: str, value):
+    """Store a single value in the app settings file."""
+    with _settings_lock:
+        settings = _load_settings()
+        settings[key] = value
+        _save_settings(settings)
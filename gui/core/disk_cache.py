@@ -0,0 +1,169 @@
+# core/disk_cache.py
+"""Persistent Feather sidecar cache of parsed sheets, reloaded via memory-map."""
+
+import hashlib
+import os
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    HAVE_ARROW = True
+except ImportError:
+    # No pyarrow → caching is silently disabled and every load parses the file
+    HAVE_ARROW = False
+
+CACHE_DIR = ".sheet_cache"
+DEFAULT_MAX_MB = 2048
+DEFAULT_MAX_AGE_DAYS = 30
+
+_HASH_CHUNK = 4 * 1024 ** 2
+FORMAT_VERSION = 2  # bump when readers convert values differently, to drop stale entries
+_hash_memo: dict[tuple, str] = {}
+
+
+def content_hash(path: str) -> str:
+    """Hash the file bytes; memoised per (path, mtime, size) for this process."""
+    st = os.stat(path)
+    sig = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    digest = _hash_memo.get(sig)
+    if digest is None:
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+                h.update(chunk)
+        digest = _hash_memo[sig] = h.hexdigest()
+    return digest
+
+
+class SheetDiskCache:
+    """Feather files keyed by file content hash + sheet + header row (+ columns).
+
+    Files are written uncompressed so a hit can be memory-mapped straight into
+    Arrow buffers.  Eviction drops entries older than *max_age_days* and then
+    the least recently used ones until the total size fits in *max_bytes*.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR,
+                 max_bytes: int = DEFAULT_MAX_MB * 1024 ** 2,
+                 max_age_days: float = DEFAULT_MAX_AGE_DAYS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.enabled = HAVE_ARROW
+
+    # ------------------------------------------------------------------ #
+    # Keys                                                               #
+    # ------------------------------------------------------------------ #
+    def entry_path(self, path: str, sheet_name, header_row, columns=None) -> str:
+        variant = repr((FORMAT_VERSION, sheet_name, header_row, sorted(columns) if columns else None))
+        tag = hashlib.blake2b(variant.encode("utf-8"), digest_size=8).hexdigest()
+        return os.path.join(self.cache_dir, f"{content_hash(path)}-{tag}.feather")
+
+    # ------------------------------------------------------------------ #
+    # Read / write                                                       #
+    # ------------------------------------------------------------------ #
+    def get(self, entry: str):
+        """Return the cached DataFrame for *entry*, or None on a miss."""
+        if not self.enabled or not os.path.exists(entry):
+            return None
+        try:
+            table = feather.read_table(entry, memory_map=True)
+            os.utime(entry)  # mark as recently used for eviction
+            return table.to_pandas()
+        except (OSError, pa.ArrowException):
+            self._remove(entry)
+            return None
+
+    def contains(self, path: str, sheet_name, header_row, columns=None) -> bool:
+        return self.enabled and os.path.exists(
+            self.entry_path(path, sheet_name, header_row, columns)
+        )
+
+    def put(self, entry: str, df) -> bool:
+        """Write *df* to *entry*; returns False if the frame can't be stored."""
+        if not self.enabled:
+            return False
+        # Feather needs unique string column names
+        if not all(isinstance(c, str) for c in df.columns) or df.columns.has_duplicates:
+            return False
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{entry}.{os.getpid()}.tmp"
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            feather.write_feather(table, tmp, compression="uncompressed")
+            os.replace(tmp, entry)
+        except (OSError, pa.ArrowException, TypeError, ValueError):
+            # e.g. mixed-type object columns Arrow can't represent
+            self._remove(tmp)
+            return False
+        self.evict()
+        return True
+
+    def load(self, path: str, sheet_name, header_row, reader, columns=None):
+        """Return the sheet from cache, or call *reader()* and store its result."""
+        if not self.enabled:
+            return reader()
+        entry = self.entry_path(path, sheet_name, header_row, columns)
+        df = self.get(entry)
+        if df is None:
+            df = reader()
+            self.put(entry, df)
+        return df
+
+    # ------------------------------------------------------------------ #
+    # Maintenance                                                        #
+    # ------------------------------------------------------------------ #
+    def _entries(self) -> list[tuple[str, float, int]]:
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".feather"):
+                continue
+            full = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            entries.append((full, st.st_mtime, st.st_size))
+        return entries
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self) -> int:
+        """Apply the age and size limits; returns the number of bytes freed."""
+        now = time.time()
+        freed = 0
+        live = []
+        for full, mtime, size in self._entries():
+            if now - mtime > self.max_age:
+                self._remove(full)
+                freed += size
+            else:
+                live.append((full, mtime, size))
+        live.sort(key=lambda e: e[1])  # oldest access first
+        total = sum(size for _, _, size in live)
+        for full, _, size in live:
+            if total <= self.max_bytes:
+                break
+            self._remove(full)
+            total -= size
+            freed += size
+        return freed
+
+    def purge(self) -> int:
+        """Delete every cache entry; returns the number of bytes freed."""
+        freed = 0
+        for full, _, size in self._entries():
+            self._remove(full)
+            freed += size
+        return freed
+
+    def size(self) -> int:
+        return sum(size for _, _, size in self._entries())
@@ -1,20 +1,99 @@
+import time
+
 import pandas as pd
 from tkinter import filedialog, messagebox # Keep these for UI interaction
-from asteval import Interpreter
 
-# Create a persistent asteval interpreter instance
-aeval = Interpreter()
+from gui.core.formula_engine import ROW_WISE
+from gui.core.formula_graph import ColumnResults, FormulaCycleError, FormulaProbeError, source_columns
+from gui.core.compactor import widen_for_eval
+from gui.core.writers import write_targets, target_paths, save_filetypes, describe_write
 
-def evaluate_with_asteval(row, formula):
-    """Helper function to evaluate a formula for a row using asteval."""
-    try:
-        return aeval(formula, symtable=row.to_dict())
-    except Exception as e:
-        return f"#AERR! {e}"
+def active_formulas(formula_vars):
+    """
+    Returns {column: formula} for every column with a non-empty formula.
+    """
+    formulas = {}
+    for col, var in formula_vars.items():
+        text = var.get().strip() if var else ""
+        if text:
+            formulas[col] = text
+    return formulas
+
+def required_columns(sheet_columns, column_vars, formula_vars, main_key=""):
+    """
+    Returns the source columns an export actually reads, in sheet order:
+    selected columns, every column a selected formula references (following
+    references to other formula columns), and the join key.
+    """
+    selected = [col for col, var in column_vars.items() if var.get()]
+    needed = source_columns(active_formulas(formula_vars), selected)
+    if main_key.strip():
+        needed.add(main_key.strip())
+    return [c for c in sheet_columns if c in needed]
 
-def export_to_excel(df, column_vars, formula_vars, ref_df, main_key, ref_key, ref_cols_input, file_path):
+def describe_paths(paths):
     """
-    Exports data to Excel, evaluating formulas using pandas.eval and asteval as fallback.
+    Summarises how each formula column was evaluated, e.g. for the export dialog.
+    """
+    if not paths:
+        return ""
+    vectorised = [c for c, (path, _) in paths.items() if path != ROW_WISE]
+    lines = ["", ""]
+    if vectorised:
+        lines.append(f"Vectorised: {', '.join(vectorised)}")
+    for col, (path, reason) in paths.items():
+        if path == ROW_WISE:
+            lines.append(f"Row-wise: {col} ({reason})")
+    return "\n".join(lines)
+
+def describe_errors(errors, index):
+    """
+    Summarises the rows each formula column failed on (left empty in the output).
+    """
+    lines = []
+    for col, col_errors in errors.items():
+        lines.append(f"Errors in {col} ({len(col_errors):,} row(s) left empty):")
+        lines.extend("  " + line for line in col_errors.describe(index).splitlines())
+    return "\n".join(lines)
+
+def describe_cache(results):
+    """
+    One-line summary of result-cache use for the export dialog.
+    """
+    stats = results.cache.stats() if results.cache is not None else None
+    line = f"Reused {len(results.reused)} cached column(s), computed {len(results.recomputed)}"
+    if stats:
+        line += (f" (cache: {stats['hits']} hits, {stats['misses']} misses, "
+                 f"{stats['evictions']} evictions, {stats['bytes'] / 1024 ** 2:.1f} MB)")
+    return line
+
+def write_progress(status):
+    """
+    progress(done, total) callback for writers that reports rows and rows/s through status.
+    """
+    start = time.perf_counter()
+    def report(done, total):
+        rate = done / max(time.perf_counter() - start, 1e-9)
+        status(f"Writing rows: {done:,}/{total:,} ({rate:,.0f} rows/s)")
+    return report
+
+def export_to_excel(df, column_vars, formula_vars, ref_df, main_key, ref_key, ref_cols_input, file_path,
+                    results=None, status=None, extra_formats=""):
+    """
+    Exports data to Excel, evaluating formulas with compiled vectorised plans
+    and asteval row by row only where a formula cannot be vectorised.
+    Formulas may read other formula columns; they are evaluated in dependency
+    order. Pass the ColumnResults from a previous export of the same frame
+    as results to reuse columns whose formulas (and inputs) did not change.
+    Rows a formula fails on are left empty and summarised in the final
+    message; in fail-fast mode (results.fail_fast) nothing is written if
+    a formula fails on the probe rows.
+    The output format follows the chosen file's extension (.xlsx, .csv,
+    .tsv, .parquet, .feather, .jsonl) and is written in row chunks by a
+    streaming writer (see writers.py). extra_formats ("csv, parquet")
+    writes the same result to sibling files as well, concurrently and
+    without evaluating anything again. status(message), if given,
+    receives the rows written and the rate.
     """
     selected_cols = [col for col, var in column_vars.items() if var.get()]
     if not selected_cols:
@@ -25,21 +104,28 @@ def export_to_excel(df, column_vars, formula_vars, ref_df, main_key, ref_key, re
          messagebox.showerror("Error", "No main data loaded to export.")
          return
 
+    formulas = active_formulas(formula_vars)
+    if results is None or results.frame is not df:
+        results = ColumnResults(df)
+    try:
+        computed = results.evaluate(formulas, selected_cols)
+    except FormulaCycleError as exc:
+        messagebox.showerror("Formula Error", f"Formulas reference each other in a loop:\n{exc}")
+        return
+    except FormulaProbeError as exc:
+        messagebox.showerror("Formula Error", f"Stopped before evaluating the full sheet:\n{exc}")
+        return
+    except Exception as apply_err:
+        messagebox.showerror("Apply Error", f"Failed to apply formulas: {apply_err}")
+        return
+
     result = pd.DataFrame(index=df.index)
+    paths = {}  # column -> (evaluation path, reason)
+    errors = {}  # column -> FormulaErrors
 
     for col in selected_cols:
-        # --- Get the formula string ---
-        # Get the StringVar object if it exists for this column
-        formula_var_object = formula_vars.get(col)
-
-        # Retrieve the string value from the StringVar, default to "" if object is missing
-        formula = ""
-        if formula_var_object:
-            formula = formula_var_object.get().strip()
-        # Removed the incorrect reference to tk.StringVar here
-
         # --- Process based on formula presence ---
-        if not formula:
+        if col not in computed:
             # No formula, just copy the original column if it exists
             if col in df.columns:
                 result[col] = df[col]
@@ -48,15 +134,12 @@ def export_to_excel(df, column_vars, formula_vars, ref_df, main_key, ref_key, re
                 result[col] = None
             continue
 
-        # --- Formula Evaluation (remains the same) ---
-        try:
-            result[col] = df.eval(formula)
-        except Exception as pd_eval_err:
-            try:
-                result[col] = df.apply(lambda row: evaluate_with_asteval(row, formula), axis=1)
-            except Exception as apply_err:
-                messagebox.showerror("Apply Error", f"Failed to apply formula for column '{col}': {apply_err}")
-                result[col] = f"#APPLY_ERR! {apply_err}"
+        # --- Formula result (evaluated above in dependency order) ---
+        values, path, reason, col_errors = computed[col]
+        result[col] = values
+        paths[col] = (path, reason)
+        if col_errors:
+            errors[col] = col_errors
 
     # --- Reference File Join (remains the same) ---
     if ref_df is not None:
@@ -83,6 +166,8 @@ def export_to_excel(df, column_vars, formula_vars, ref_df, main_key, ref_key, re
                 try:
                     ref_slice = ref_df[[ref_key_stripped] + ref_cols].copy()
                     ref_slice = ref_slice.loc[:,~ref_slice.columns.duplicated()]
+                    result = widen_for_eval(result, [main_key_stripped])
+                    ref_slice = widen_for_eval(ref_slice, [ref_key_stripped])
                     result = result.merge(
                         ref_slice,
                         left_on=main_key_stripped,
@@ -93,14 +178,24 @@ def export_to_excel(df, column_vars, formula_vars, ref_df, main_key, ref_key, re
                     messagebox.showerror("Join Error", f"Error during merge operation: {e}")
                     return
 
-    # --- Save Output (remains the same) ---
+    # --- Save Output (streamed in row chunks) ---
     out_path = filedialog.asksaveasfilename(
         defaultextension=".xlsx",
-        filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")]
+        filetypes=save_filetypes()
         )
     if out_path:
         try:
-            result.to_excel(out_path, index=False)
-            messagebox.showinfo("Done", f"Data successfully exported to:\n{out_path}")
+            targets = target_paths(out_path, extra_formats)
+            written = write_targets(result, targets, write_progress(status) if status else None)
+            if status:
+                status(describe_write(written[0]) if len(written) == 1 else f"Wrote {len(written)} files")
+            report = "\n" + "\n".join(describe_write(stats) for stats in written) + describe_paths(paths)
+            if errors:
+                report += "\n" + describe_errors(errors, df.index)
+            if results.cse.summary():
+                report += "\n" + results.cse.summary()
+            report += "\n" + describe_cache(results)
+            files = [f for stats in written for f in stats["files"]]
+            messagebox.showinfo("Done", "Data successfully exported to:\n" + "\n".join(files) + report)
         except Exception as e:
-             messagebox.showerror("Export Error", f"Failed to save the Excel file:\n{e}")
\ No newline at end of file
+             messagebox.showerror("Export Error", f"Failed to save the export file:\n{e}")
\ No newline at end of file
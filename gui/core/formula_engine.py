@@ -1,43 +1,1319 @@
+import ast
+import atexit
+import hashlib
+import io
+import itertools
+import multiprocessing
+import operator
+import os
+import re
+import threading
+import time
+import tokenize
+import weakref
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache, reduce
+
 import numpy as np
 import pandas as pd
+import asteval
 from asteval import Interpreter # Import asteval
 
+from gui.core.compactor import widen_for_eval
+from gui.core.config_manager import get_setting
+
+try:
+    import numexpr
+    HAVE_NUMEXPR = True
+except ImportError:
+    # No numexpr → large frames are split into chunks on a thread pool instead
+    HAVE_NUMEXPR = False
+
 # Create a persistent asteval interpreter instance
 aeval = Interpreter()
 
-def evaluate_formula(df, col, formula):
+_BACKTICK_RE = re.compile(r"`([^`]*)`")
+_IDENT_RE = re.compile(r"[A-Za-z_]\w*")
+
+
+@lru_cache(maxsize=1024)
+def referenced_names(formula):
+    """
+    Returns the set of identifiers a formula refers to (column candidates).
+    Backtick-quoted names (pandas.eval syntax) are included verbatim.
+    """
+    quoted = set(_BACKTICK_RE.findall(formula))
+    stripped = _BACKTICK_RE.sub("0", formula)
+    try:
+        tree = ast.parse(stripped, mode="eval")
+    except SyntaxError:
+        # Not valid Python; be conservative and keep every word-like token
+        return frozenset(quoted | set(_IDENT_RE.findall(stripped)))
+    names = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+    return frozenset(quoted | names)
+
+# Paths a formula can take when it is evaluated over a whole column
+VECTORISED = "vectorised"
+ROW_WISE = "row-wise"
+
+
+class FormulaNotVectorisable(Exception):
+    """Raised when a formula uses a construct the compiler cannot lower."""
+
+
+def _rewrite_backticks(formula):
+    """
+    Replaces `quoted names` with plain identifiers.
+    Returns (rewritten text, {identifier: column name}).
+    """
+    aliases = {}
+
+    def alias(match):
+        ident = f"__col{len(aliases)}__"
+        aliases[ident] = match.group(1)
+        return ident
+
+    return _BACKTICK_RE.sub(alias, formula), aliases
+
+
+def parse_pandas_precedence(text):
+    """
+    Parses a formula the way pandas.eval groups & and |.
+    pandas.eval reads them as `and` / `or`, below comparisons, so
+    `a > 1 & b > 1` means `(a > 1) & (b > 1)` rather than Python's chained
+    `a > (1 & b) > 1`. Returns an ast.Expression whose & / | are BinOp
+    nodes grouped that way; `and` / `or` typed as words stay BoolOps.
+    """
+    if "&" not in text and "|" not in text:
+        return ast.parse(text, mode="eval")
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(text).readline))
+    except (tokenize.TokenError, SyntaxError):
+        return ast.parse(text, mode="eval")  # reports the syntax error
+    line_starts = [0]
+    for line in text.splitlines(keepends=True):
+        line_starts.append(line_starts[-1] + len(line))
+    pieces, injected, pos, shift = [], set(), 0, 0
+    for tok in tokens:
+        if tok.type == tokenize.OP and tok.string in ("&", "|"):
+            start = line_starts[tok.start[0] - 1] + tok.start[1]
+            word = " and " if tok.string == "&" else " or "
+            pieces.append(text[pos:start])
+            injected.add(start + shift + 1)  # where the keyword lands in the new text
+            pieces.append(word)
+            shift += len(word) - 1
+            pos = start + 1
+    pieces.append(text[pos:])
+    rewritten = "".join(pieces)
+    tree = ast.parse(rewritten, mode="eval")
+
+    lines = rewritten.splitlines(keepends=True) or [""]
+    starts = [0]
+    for line in lines:
+        starts.append(starts[-1] + len(line))
+
+    def offset(lineno, col):
+        # ast columns are UTF-8 byte offsets within the line
+        line = lines[lineno - 1]
+        return starts[lineno - 1] + len(line.encode("utf-8")[:col].decode("utf-8", "ignore"))
+
+    class Regroup(ast.NodeTransformer):
+        def visit_BoolOp(self, node):
+            self.generic_visit(node)
+            result = node.values[0]
+            for left, right in zip(node.values, node.values[1:]):
+                gap = range(offset(left.end_lineno, left.end_col_offset), offset(right.lineno, right.col_offset))
+                if any(i in injected for i in gap):
+                    op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+                    result = ast.BinOp(left=result, op=op, right=right)
+                elif isinstance(result, ast.BoolOp) and type(result.op) is type(node.op):
+                    result.values.append(right)
+                else:
+                    result = ast.BoolOp(op=node.op, values=[result, right])
+                ast.copy_location(result, node)
+            return result
+
+    return ast.fix_missing_locations(Regroup().visit(tree))
+
+
+# ---------------------------------------------------------------------- #
+# Runtime helpers used by compiled plans (Series or scalar operands)     #
+# ---------------------------------------------------------------------- #
+def _as_series(value, index):
+    if isinstance(value, pd.Series):
+        return value
+    if isinstance(value, (list, tuple)):
+        return pd.Series([value] * len(index), index=index)
+    return pd.Series(value, index=index)
+
+
+def _truthy(value):
+    if not isinstance(value, pd.Series):
+        return bool(value)
+    if pd.api.types.is_bool_dtype(value):
+        return value
+    if pd.api.types.is_numeric_dtype(value):
+        return value != 0
+    return value.notna() & (value != "")
+
+
+def _where(cond, if_true, if_false):
+    if not isinstance(cond, pd.Series):
+        return if_true if cond else if_false
+    return _as_series(if_true, cond.index).where(cond, _as_series(if_false, cond.index))
+
+
+def _and(a, b):
+    if not isinstance(a, pd.Series) and not isinstance(b, pd.Series):
+        return a and b
+    return _where(_truthy(a), b, a)
+
+
+def _or(a, b):
+    if not isinstance(a, pd.Series) and not isinstance(b, pd.Series):
+        return a or b
+    return _where(_truthy(a), a, b)
+
+
+def _not(a):
+    truth = _truthy(a)
+    return ~truth if isinstance(truth, pd.Series) else not truth
+
+
+def _min(*args):
+    # Python's min(a, b) keeps a unless b < a; the same rule element-wise
+    return reduce(lambda a, b: _where(b < a, b, a), args)
+
+
+def _max(*args):
+    return reduce(lambda a, b: _where(b > a, b, a), args)
+
+
+def _round(value, ndigits=None):
+    if isinstance(value, pd.Series):
+        return value.round(ndigits or 0)
+    return round(value, ndigits) if ndigits is not None else round(value)
+
+
+def _len(value):
+    return value.str.len() if isinstance(value, pd.Series) else len(value)
+
+
+def _str(value):
+    if not isinstance(value, pd.Series):
+        return str(value)
+    if pd.api.types.is_numeric_dtype(value):
+        return value.astype(str)
+    return value.map(str)
+
+
+def _int(value):
+    return value.astype("int64") if isinstance(value, pd.Series) else int(value)
+
+
+def _float(value):
+    return value.astype("float64") if isinstance(value, pd.Series) else float(value)
+
+
+def _integer(value):
+    if isinstance(value, pd.Series):
+        return isinstance(value.dtype, np.dtype) and value.dtype.kind in "iu"
+    return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+
+
+def _numpy_int_op(ufunc, fallback):
+    # pandas.eval hands integer columns to NumPy, where x // 0 and x % 0 are 0;
+    # pandas Series arithmetic would turn them into inf / NaN instead
+    def op(a, b):
+        series = a if isinstance(a, pd.Series) else b
+        if not isinstance(series, pd.Series) or not (_integer(a) and _integer(b)):
+            return fallback(a, b)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = ufunc(*(v.to_numpy() if isinstance(v, pd.Series) else v for v in (a, b)))
+        return pd.Series(values, index=series.index)
+    return op
+
+
+def _contains(container, item):
+    if isinstance(container, (list, tuple, set)):
+        return item.isin(container) if isinstance(item, pd.Series) else item in container
+    if isinstance(container, pd.Series):
+        if isinstance(item, pd.Series):
+            raise TypeError("'in' between two columns")
+        return container.str.contains(item, regex=False)
+    return item in container
+
+
+def _not_contains(container, item):
+    return _not(_contains(container, item))
+
+
+_FUNCTIONS = {
+    "abs": abs,
+    "round": _round,
+    "min": _min,
+    "max": _max,
+    "len": _len,
+    "str": _str,
+    "int": _int,
+    "float": _float,
+    # numpy ufuncs asteval also exposes under these names
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "log": np.log,
+    "log10": np.log10,
+    "floor": np.floor,
+    "ceil": np.ceil,
+}
+
+_CONSTANTS = {"True": True, "False": False, "None": None,
+              "pi": np.pi, "e": np.e, "nan": np.nan, "inf": np.inf}
+
+_BINOPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.FloorDiv: _numpy_int_op(np.floor_divide, operator.floordiv),
+    ast.Mod: _numpy_int_op(np.remainder, operator.mod),
+    ast.Pow: operator.pow, ast.BitAnd: operator.and_, ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+}
+
+_COMPARISONS = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt,
+    ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+    ast.In: lambda a, b: _contains(b, a), ast.NotIn: lambda a, b: _not_contains(b, a),
+}
+
+_UNARY = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Not: _not, ast.Invert: operator.invert}
+
+# str methods that map onto the pandas .str accessor one-to-one
+_STR_METHODS = {
+    "upper", "lower", "title", "capitalize", "swapcase", "strip", "lstrip", "rstrip",
+    "startswith", "endswith", "zfill", "find", "rfind", "split", "rsplit", "center",
+    "ljust", "rjust", "isdigit", "isalpha", "isalnum", "isnumeric", "isspace",
+    "islower", "isupper", "istitle", "replace", "count",
+    # pandas-only accessor methods, reachable as x.str.<name>(...)
+    "contains", "len", "slice", "get", "pad", "match", "fullmatch",
+}
+
+
+def _call_str_method(value, method, args, kwargs):
+    if not isinstance(value, pd.Series):
+        return getattr(value, method)(*args, **kwargs)
+    accessor = value.str
+    if method == "replace":
+        # Python semantics: literal replacement, optional max count
+        count = args[2] if len(args) > 2 else kwargs.get("count", -1)
+        return accessor.replace(args[0], args[1], n=count, regex=False)
+    if method == "count":
+        return accessor.count(re.escape(args[0]))
+    return getattr(accessor, method)(*args, **kwargs)
+
+
+class _StrAccessor:
+    """Placeholder for `x.str` so `x.str.upper()` compiles like `x.upper()`."""
+
+    def __init__(self, value):
+        self.value = value
+
+
+# ---------------------------------------------------------------------- #
+# Common sub-expressions                                                 #
+# ---------------------------------------------------------------------- #
+# node types worth computing once when several formulas contain them
+_SHAREABLE = (ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call, ast.Subscript)
+
+
+class SubexpressionCache:
+    """
+    Shares identical sub-expression results between the formulas of one
+    export. A sub-expression is identified by its AST plus what each name
+    in it resolves to (source column or computed formula column), so the
+    same text in different columns only matches when it reads the same data.
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self.shared = set()
+        self.values = {}
+        self.hits = 0
+        self.saved = 0.0  # seconds of evaluation skipped by reuse
+        self._cost = {}
+
+    def add(self, plan, binding):
+        """
+        Counts the sub-expressions of a compiled formula. Repeats of a
+        subtree are not descended into: their inner nodes are shared anyway.
+        """
+        if plan.tree is None or plan.mode != VECTORISED:
+            return
+        token = plan.token_for(binding)
+        stack = [plan.tree]
+        while stack:
+            node = stack.pop()
+            cse = getattr(node, "_cse", None)
+            if cse is not None:
+                key = (cse[0], tuple(token(n) for n in cse[1]))
+                self._counts[key] += 1
+                if self._counts[key] > 1:
+                    continue
+            stack.extend(ast.iter_child_nodes(node))
+        self.shared = {key for key, count in self._counts.items() if count > 1}
+
+    def get_or_compute(self, key, fn, env):
+        # chunked evaluation stores one value per row chunk; each chunk is
+        # only ever evaluated by one thread at a time
+        slot = (key, env.chunk)
+        if slot in self.values:
+            if not env.chunk:  # count a reuse once, not once per chunk
+                self.hits += 1
+            self.saved += self._cost[slot]
+            return self.values[slot]
+        start = time.perf_counter()
+        value = fn(env)
+        if key in self.shared:
+            self.values[slot] = value
+            self._cost[slot] = time.perf_counter() - start
+        return value
+
+    def summary(self):
+        if not self.hits:
+            return ""
+        shared = len({key for key, _ in self.values})
+        return (f"Shared sub-expressions: {shared} computed once, "
+                f"reused {self.hits} times (~{self.saved:.2f}s saved)")
+
+
+class _Env:
+    """Name resolver handed to compiled plans, plus the optional CSE cache."""
+
+    __slots__ = ("resolve", "token", "cache", "chunk")
+
+    def __init__(self, resolve, token=None, cache=None, chunk=None):
+        self.resolve = resolve
+        self.token = token
+        self.cache = cache
+        self.chunk = chunk
+
+    def __call__(self, name):
+        return self.resolve(name)
+
+
+def _shareable(fn, cse):
+    dump, names = cse
+
+    def run(env):
+        if env.cache is None:
+            return fn(env)
+        key = (dump, tuple(env.token(n) for n in names))
+        return env.cache.get_or_compute(key, fn, env)
+    return run
+
+
+# ---------------------------------------------------------------------- #
+# Compiler                                                               #
+# ---------------------------------------------------------------------- #
+class _Lowering:
+    """Turns an allow-listed AST into nested closures over a name resolver."""
+
+    def compile(self, node):
+        handler = getattr(self, f"_{type(node).__name__}", None)
+        if handler is None:
+            raise FormulaNotVectorisable(f"'{type(node).__name__}' is not supported")
+        fn = handler(node)
+        if isinstance(node, _SHAREABLE):
+            names = sorted({n.id for n in ast.walk(node) if isinstance(n, ast.Name)})
+            node._cse = (ast.dump(node), tuple(names))
+            fn = _shareable(fn, node._cse)
+        return fn
+
+    def _Expression(self, node):
+        return self.compile(node.body)
+
+    def _Constant(self, node):
+        value = node.value
+        return lambda env: value
+
+    def _Name(self, node):
+        name = node.id
+        return lambda env: env(name)
+
+    def _List(self, node):
+        items = [self.compile(elt) for elt in node.elts]
+        return lambda env: [item(env) for item in items]
+
+    _Tuple = _List
+
+    def _BinOp(self, node):
+        op = _BINOPS.get(type(node.op))
+        if op is None:
+            raise FormulaNotVectorisable(f"operator '{type(node.op).__name__}' is not supported")
+        left, right = self.compile(node.left), self.compile(node.right)
+        return lambda env: op(left(env), right(env))
+
+    def _UnaryOp(self, node):
+        op = _UNARY.get(type(node.op))
+        if op is None:
+            raise FormulaNotVectorisable(f"operator '{type(node.op).__name__}' is not supported")
+        operand = self.compile(node.operand)
+        return lambda env: op(operand(env))
+
+    def _BoolOp(self, node):
+        combine = _and if isinstance(node.op, ast.And) else _or
+        values = [self.compile(v) for v in node.values]
+        # Python truthiness rules, applied element-wise on columns
+        return lambda env: reduce(combine, (v(env) for v in values))
+
+    def _Compare(self, node):
+        ops = [_COMPARISONS.get(type(op)) for op in node.ops]
+        unsupported = [type(op).__name__ for op, fn in zip(node.ops, ops) if fn is None]
+        if unsupported:
+            raise FormulaNotVectorisable(f"comparison '{unsupported[0]}' is not supported")
+        operands = [self.compile(node.left)] + [self.compile(c) for c in node.comparators]
+
+        def compare(env):
+            values = [operand(env) for operand in operands]
+            results = [op(values[i], values[i + 1]) for i, op in enumerate(ops)]
+            return reduce(_and, results)
+        return compare
+
+    def _IfExp(self, node):
+        test, body, orelse = self.compile(node.test), self.compile(node.body), self.compile(node.orelse)
+        return lambda env: _where(_truthy(test(env)), body(env), orelse(env))
+
+    def _Subscript(self, node):
+        value = self.compile(node.value)
+        index = node.slice
+        if isinstance(index, ast.Slice):
+            parts = [self._literal_int(p) for p in (index.lower, index.upper, index.step)]
+            key = slice(*parts)
+        else:
+            key = self._literal_int(index)
+
+        def subscript(env):
+            target = value(env)
+            if isinstance(target, _StrAccessor):
+                target = target.value  # x.str[:4] is the same as x[:4]
+            return target.str[key] if isinstance(target, pd.Series) else target[key]
+        return subscript
+
+    def _Attribute(self, node):
+        if node.attr != "str":
+            raise FormulaNotVectorisable(f"attribute '.{node.attr}' is not supported")
+        value = self.compile(node.value)
+        return lambda env: _StrAccessor(value(env))
+
+    def _Call(self, node):
+        args = [self.compile(a) for a in node.args]
+        if any(isinstance(a, ast.Starred) for a in node.args):
+            raise FormulaNotVectorisable("*args calls are not supported")
+        kwargs = {kw.arg: self.compile(kw.value) for kw in node.keywords if kw.arg}
+        if len(kwargs) != len(node.keywords):
+            raise FormulaNotVectorisable("**kwargs calls are not supported")
+
+        if isinstance(node.func, ast.Name):
+            name = node.func.id
+            func = _FUNCTIONS.get(name)
+            if func is None:
+                raise FormulaNotVectorisable(f"function '{name}' is not supported")
+            if name in ("min", "max") and len(args) < 2:
+                raise FormulaNotVectorisable(f"{name}() over an iterable is not supported")
+            return lambda env: func(*(a(env) for a in args), **{k: v(env) for k, v in kwargs.items()})
+
+        if isinstance(node.func, ast.Attribute) and node.func.attr in _STR_METHODS:
+            method = node.func.attr
+            target = self.compile(node.func.value)
+
+            def call(env):
+                value = target(env)
+                if isinstance(value, _StrAccessor):
+                    value = value.value
+                return _call_str_method(value, method, [a(env) for a in args],
+                                        {k: v(env) for k, v in kwargs.items()})
+            return call
+        raise FormulaNotVectorisable("only built-in functions and string methods can be called")
+
+    @staticmethod
+    def _literal_int(node):
+        if node is None:
+            return None
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            inner = _Lowering._literal_int(node.operand)
+            return -inner
+        if isinstance(node, ast.Constant) and isinstance(node.value, int):
+            return node.value
+        raise FormulaNotVectorisable("only constant integer indexes are supported")
+
+
+# ---------------------------------------------------------------------- #
+# numexpr lowering (numeric formulas only)                               #
+# ---------------------------------------------------------------------- #
+# Operators whose numexpr results are bit-identical to NumPy's; %, // and
+# ** are left to NumPy because their semantics or rounding differ.
+_NUMEXPR_BINOPS = {ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.Div: "/"}
+_NUMEXPR_COMPARE = {ast.Eq: "==", ast.NotEq: "!=", ast.Lt: "<", ast.LtE: "<=",
+                    ast.Gt: ">", ast.GtE: ">="}
+_BOOLEAN_NODES = (ast.Compare, ast.BoolOp)
+
+
+def _numexpr_source(node):
+    """
+    Returns numexpr source for a numeric-only formula AST, or None.
+    Names are checked for numeric dtypes at evaluation time.
+    """
+    if isinstance(node, ast.Expression):
+        return _numexpr_source(node.body)
+    if isinstance(node, ast.Name):
+        return node.id if node.id not in _CONSTANTS else None
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return repr(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    if isinstance(node, ast.BinOp) and type(node.op) in _NUMEXPR_BINOPS:
+        left, right = _numexpr_source(node.left), _numexpr_source(node.right)
+        if left and right:
+            return f"({left} {_NUMEXPR_BINOPS[type(node.op)]} {right})"
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        operand = _numexpr_source(node.operand)
+        return f"(-{operand})" if operand else None
+    if isinstance(node, ast.Compare) and len(node.ops) == 1 and type(node.ops[0]) in _NUMEXPR_COMPARE:
+        left, right = _numexpr_source(node.left), _numexpr_source(node.comparators[0])
+        if left and right:
+            return f"({left} {_NUMEXPR_COMPARE[type(node.ops[0])]} {right})"
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitAnd, ast.BitOr)) \
+            and isinstance(node.left, _BOOLEAN_NODES) and isinstance(node.right, _BOOLEAN_NODES):
+        left, right = _numexpr_source(node.left), _numexpr_source(node.right)
+        if left and right:
+            return f"({left} {'&' if isinstance(node.op, ast.BitAnd) else '|'} {right})"
+    if isinstance(node, ast.BoolOp) and all(isinstance(v, _BOOLEAN_NODES) for v in node.values):
+        # Python and/or equal &/| only when every operand is already boolean
+        parts = [_numexpr_source(v) for v in node.values]
+        if all(parts):
+            joiner = " & " if isinstance(node.op, ast.And) else " | "
+            return "(" + joiner.join(parts) + ")"
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "abs" \
+            and len(node.args) == 1 and not node.keywords:
+        arg = _numexpr_source(node.args[0])
+        return f"abs({arg})" if arg else None
+    return None
+
+
+class CompiledFormula:
+    """
+    A formula lowered to whole-column pandas/NumPy operations.
+    `mode` is VECTORISED, or ROW_WISE with `reason` saying why not.
+    """
+
+    def __init__(self, formula):
+        self.formula = formula
+        self.names = referenced_names(formula)
+        self.reason = ""
+        self.tree = None
+        self._plan = None
+        self.numexpr_source = None
+        text, self._aliases = _rewrite_backticks(formula)
+        # whitespace-insensitive identity of the formula, for result caching
+        self.normalised = formula.strip()
+        try:
+            self.tree = parse_pandas_precedence(text.strip())
+            self.normalised = repr((ast.dump(self.tree), sorted(self._aliases.items())))
+            self._plan = _Lowering().compile(self.tree)
+            self.numexpr_source = _numexpr_source(self.tree)
+            calls = {id(n.func) for n in ast.walk(self.tree) if isinstance(n, ast.Call)}
+            self._numexpr_names = {n.id for n in ast.walk(self.tree)
+                                   if isinstance(n, ast.Name) and id(n) not in calls}
+        except SyntaxError as exc:
+            self.reason = f"syntax error: {exc.msg}"
+        except FormulaNotVectorisable as exc:
+            self.reason = str(exc)
+        except (KeyError, TypeError, ValueError) as exc:
+            # a construct the lowering code did not anticipate: leave it to asteval
+            self._plan = None
+            self.reason = f"not supported: {type(exc).__name__}: {exc}"
+
+    @property
+    def mode(self):
+        return VECTORISED if self._plan is not None else ROW_WISE
+
+    def token_for(self, binding):
+        """
+        Maps identifiers in this formula (backtick aliases included) to
+        binding(column name), the identity used for sub-expression sharing.
+        """
+        return lambda name: binding(self._aliases.get(name, name))
+
+    def evaluate(self, df, cache=None, binding=None, chunk=None):
+        """
+        Evaluates the plan over every row of df and returns a Series.
+        Raises FormulaNotVectorisable if the formula must run row-wise.
+        With a SubexpressionCache and a binding(column) function, shared
+        sub-expressions are taken from / stored in the cache; chunk tags
+        the cached values when df is one row chunk of a larger frame.
+        """
+        if self._plan is None:
+            raise FormulaNotVectorisable(self.reason)
+        frame = widen_for_eval(df, self.names)
+        columns = set(frame.columns)
+
+        def resolve(name):
+            column = self._aliases.get(name, name)
+            if column in columns:
+                return frame[column]
+            if name in _CONSTANTS:
+                return _CONSTANTS[name]
+            raise NameError(f"name '{column}' is not a column")
+
+        env = _Env(resolve, chunk=chunk)
+        if cache is not None and binding is not None:
+            env.token, env.cache = self.token_for(binding), cache
+        result = self._plan(env)
+        if isinstance(result, _StrAccessor):
+            result = result.value
+        return _as_series(result, frame.index)
+
+    def evaluate_numexpr(self, df, threads):
+        """
+        Evaluates a numeric-only formula with numexpr's multithreaded VM.
+        Returns None when the formula or its columns don't qualify.
+        """
+        if not HAVE_NUMEXPR or self.numexpr_source is None:
+            return None
+        frame = widen_for_eval(df, self.names)
+        arrays = {}
+        for ident in self._numexpr_names:
+            column = self._aliases.get(ident, ident)
+            if column not in frame.columns:
+                return None
+            series = frame[column]
+            # bool columns are excluded: numexpr does bool arithmetic in int32
+            if not (isinstance(series.dtype, np.dtype) and series.dtype.kind in "iuf"):
+                return None
+            arrays[ident] = series.to_numpy()
+        # the thread count is process-wide: set it for this call only
+        with _numexpr_lock:
+            previous = numexpr.set_num_threads(threads)
+            try:
+                result = numexpr.evaluate(self.numexpr_source, local_dict=arrays)
+            except Exception:
+                return None  # e.g. an operand type numexpr rejects; the plan handles it
+            finally:
+                numexpr.set_num_threads(previous)
+        return pd.Series(result, index=frame.index)
+
+
+def evaluate_pandas(df, formula):
     """
-    Evaluates a formula for preview using pandas.eval and asteval as a fallback.
+    Evaluates a formula with DataFrame.eval, the tier between the compiled
+    plan and asteval: it covers Series methods and accessors the compiler
+    does not lower (x.abs(), x.clip(0), x.dt.year, ...).
+    Raises if the result is not one value per row.
+    """
+    frame = widen_for_eval(df, referenced_names(formula))
+    result = frame.eval(formula)
+    if isinstance(result, pd.Series) and result.index.equals(frame.index):
+        return result.rename(None)
+    if np.ndim(result) == 0:
+        return _as_series(result, frame.index)
+    raise TypeError(f"formula gives a {type(result).__name__}, not a column")
+
+
+@lru_cache(maxsize=512)
+def compile_formula(formula):
+    """
+    Returns the cached CompiledFormula for a formula string.
+    """
+    return CompiledFormula(formula)
+
+
+def evaluate_with_asteval(row, formula, interpreter=None):
+    """
+    Evaluates a formula for one row with asteval.
+    Errors come back as "#AERR! <message>" strings.
+    """
+    interpreter = interpreter or aeval
+    text, aliases = _rewrite_backticks(formula)
+    interpreter.symtable.update(row.to_dict())
+    for ident, column in aliases.items():
+        interpreter.symtable[ident] = row.get(column)
+    try:
+        return interpreter.eval(text, show_errors=False, raise_errors=True)
+    except Exception as e:
+        return f"#AERR! {e}"
+
+
+ERROR_SAMPLE_ROWS = 5  # row positions kept per error class
+
+
+class FormulaErrors:
+    """
+    Rows a formula failed on, kept apart from its (typed) values.
+    positions are row positions in the evaluated frame; summary maps each
+    error class to [count, first ERROR_SAMPLE_ROWS positions, first message].
+    """
+
+    def __init__(self, n_rows=0):
+        self.n_rows = n_rows
+        self.positions = []
+        self.summary = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def add(self, position, kind, message):
+        self.positions.append(position)
+        entry = self.summary.get(kind)
+        if entry is None:
+            self.summary[kind] = [1, [position], message]
+        else:
+            entry[0] += 1
+            if len(entry[1]) < ERROR_SAMPLE_ROWS:
+                entry[1].append(position)
+
+    def extend(self, other, offset=0):
+        """Append the errors of the next partition, which starts at row *offset*."""
+        self.positions.extend(p + offset for p in other.positions)
+        for kind, (count, rows, message) in other.summary.items():
+            entry = self.summary.setdefault(kind, [0, [], message])
+            entry[0] += count
+            entry[1].extend(r + offset for r in rows[:ERROR_SAMPLE_ROWS - len(entry[1])])
+
+    @property
+    def mask(self):
+        """Boolean array over the evaluated rows, True where the formula failed."""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.positions] = True
+        return mask
+
+    @property
+    def first_message(self):
+        kind, (_, _, message) = next(iter(self.summary.items()))
+        return f"{kind}: {message}"
+
+    def describe(self, index=None):
+        """One line per error class: count, first rows (labels from index, if given) and message."""
+        lines = []
+        for kind, (count, rows, message) in sorted(self.summary.items(), key=lambda kv: -kv[1][0]):
+            if index is not None:
+                rows = index[rows].tolist()
+            more = ", ..." if count > len(rows) else ""
+            lines.append(f"{kind} in {count:,} row(s) (rows {', '.join(map(str, rows))}{more}): {message}")
+        return "\n".join(lines)
+
+
+# RowEvaluator runs its pre-parsed tree with Interpreter.run and reads the
+# interpreter's error list, neither of which is documented API. That is only
+# done on the asteval releases it was written against (README pins the same
+# range); any other release evaluates each row through the public eval().
+ASTEVAL_TESTED = ((1, 0), (1, 1))  # [first, end) of the (major, minor) versions
+ASTEVAL_INTERNALS = (
+    ASTEVAL_TESTED[0] <= tuple(int(p) for p in re.findall(r"\d+", asteval.__version__)[:2]) < ASTEVAL_TESTED[1]
+    and hasattr(Interpreter, "_remove_duplicate_errors")
+)
+
+
+def _public_error(exc):
+    # (class name, message) from an exception raised by Interpreter.eval / parse;
+    # asteval prefixes the message with the expression and the class name
+    kind = type(exc).__name__
+    message = str(exc).strip().splitlines()[-1] if str(exc).strip() else ""
+    return kind, message.removeprefix(f"{kind}: ")
+
+
+def _asteval_error(interpreter, exc):
+    # (class name, message) of the error Interpreter.eval(..., raise_errors=True) would raise
+    if interpreter.error:
+        interpreter._remove_duplicate_errors()
+        err = interpreter.error[-1]
+        kind = getattr(err.exc, "__name__", None) or "UnknownError"
+        return kind, err.msg or str(exc)
+    return type(exc).__name__, str(exc)
+
+
+class RowEvaluator:
+    """
+    A formula parsed once for row-by-row evaluation with asteval.
+    values(frame) binds only the referenced columns, taken from their
+    arrays as plain tuples, into the interpreter's symbol table (updated in
+    place for every row) and runs the parsed tree (or, outside
+    ASTEVAL_TESTED, the text through Interpreter.eval). Rows that raise
+    come back as None and are recorded in a FormulaErrors.
+    """
+
+    def __init__(self, formula, interpreter=None):
+        self.interpreter = interpreter or Interpreter()
+        self.text, self.aliases = _rewrite_backticks(formula)
+        try:
+            # asteval parses with Python precedence; spell out pandas' grouping of & and |
+            if "&" in self.text or "|" in self.text:
+                self.text = ast.unparse(parse_pandas_precedence(self.text.strip()))
+        except SyntaxError:
+            pass  # asteval reports it below
+        self.names = referenced_names(formula)
+        self.tree, self.parse_error = None, None
+        if not ASTEVAL_INTERNALS:
+            return  # eval() parses (and reports syntax errors) on every row
+        self.interpreter.error = []
+        try:
+            self.tree = self.interpreter.parse(self.text)
+        except Exception as exc:
+            self.parse_error = _asteval_error(self.interpreter, exc)
+
+    def values(self, frame):
+        """(list of results, one per row of frame; FormulaErrors)."""
+        n_rows = len(frame)
+        errors = FormulaErrors(n_rows)
+        if self.parse_error is not None:
+            kind, message = self.parse_error
+            errors.positions = list(range(n_rows))
+            errors.summary[kind] = [n_rows, errors.positions[:ERROR_SAMPLE_ROWS], message]
+            return [None] * n_rows, errors
+        idents, columns = [], []
+        for name in frame.columns:
+            if name in self.names:
+                idents.append(name)
+                columns.append(frame[name].tolist())
+        for ident, name in self.aliases.items():
+            idents.append(ident)
+            columns.append(frame[name].tolist() if name in frame.columns else [None] * n_rows)
+
+        interp, tree, text = self.interpreter, self.tree, self.text
+        symtable, run = interp.symtable, interp.run
+        out = []
+        append = out.append
+        rows = zip(*columns) if columns else itertools.repeat((), n_rows)
+        if not ASTEVAL_INTERNALS:
+            evaluate = interp.eval
+            for position, row in enumerate(rows):
+                symtable.update(zip(idents, row))
+                try:
+                    value = evaluate(text, show_errors=False, raise_errors=True)
+                except Exception as exc:
+                    errors.add(position, *_public_error(exc))
+                    value = None
+                append(value)
+            return out, errors
+        for position, row in enumerate(rows):
+            symtable.update(zip(idents, row))
+            interp.error = []
+            interp.error_msg = None
+            interp.expr = text
+            interp.start_time = time.time()
+            try:
+                value = run(tree, with_raise=True)
+            except Exception as exc:
+                errors.add(position, *_asteval_error(interp, exc))
+                value = None
+            else:
+                if interp.error:
+                    errors.add(position, *_asteval_error(interp, None))
+                    value = None
+            append(value)
+        return out, errors
+
+
+# ---------------------------------------------------------------------- #
+# Multi-core evaluation                                                  #
+# ---------------------------------------------------------------------- #
+PARALLEL_MIN_ROWS = 200_000   # smaller frames are not worth splitting
+MIN_CHUNK_ROWS = 50_000
+
+_pools = {}
+_pools_lock = threading.Lock()
+_numexpr_lock = threading.Lock()  # numexpr's thread count is global state
+
+
+def eval_workers():
+    """Worker count for formula evaluation (eval_workers setting, default: all cores)."""
+    return max(1, int(get_setting("eval_workers", 0) or os.cpu_count() or 1))
+
+
+def chunk_bounds(n_rows, workers):
+    """(start, stop) row ranges splitting n_rows into at most `workers` chunks."""
+    n_chunks = max(1, min(workers, n_rows // MIN_CHUNK_ROWS))
+    edges = np.linspace(0, n_rows, n_chunks + 1).astype(np.int64)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+def _thread_pool(workers):
+    # previews (worker thread) and exports (Tk thread) can ask at the same time
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="formula")
+        return pool
+
+
+def _evaluate_parallel(plan, df, cache, binding, workers):
+    """
+    numexpr for numeric-only formulas, otherwise the compiled plan over row
+    chunks on a thread pool (NumPy and Arrow kernels release the GIL).
+    Chunks are concatenated in row order, so the result matches a
+    single-threaded evaluation.
+    """
+    values = plan.evaluate_numexpr(df, workers)
+    if values is not None:
+        return values
+    bounds = chunk_bounds(len(df), workers)
+    if len(bounds) == 1:
+        return plan.evaluate(df, cache, binding)
+    futures = [
+        _thread_pool(workers).submit(plan.evaluate, df.iloc[start:stop], cache, binding, i)
+        for i, (start, stop) in enumerate(bounds)
+    ]
+    return pd.concat([f.result() for f in futures])
+
+
+# ---------------------------------------------------------------------- #
+# Row-wise fallback                                                      #
+# ---------------------------------------------------------------------- #
+ROW_WISE_PARALLEL_MIN_ROWS = 50_000  # below this, starting processes costs more than it saves
+ROW_WISE_PARTITION_ROWS = 25_000     # partition size when progress is reported
+PARTITIONS_PER_WORKER = 4            # several partitions per worker keep progress moving
+
+_worker_interpreter = None  # per-process Interpreter, created on first use
+_worker_symbols = None      # its pristine symbol table
+
+
+def _evaluate_partition(frame, formula):
+    """Worker entry point: evaluate one row partition with this process's Interpreter."""
+    global _worker_interpreter, _worker_symbols
+    if _worker_interpreter is None:
+        _worker_interpreter = Interpreter()
+        _worker_symbols = dict(_worker_interpreter.symtable)
+    else:
+        # start every partition from the stock symbols so names set by an
+        # earlier formula (or one shadowing a builtin) do not carry over
+        _worker_interpreter.symtable.clear()
+        _worker_interpreter.symtable.update(_worker_symbols)
+    return RowEvaluator(formula, _worker_interpreter).values(frame)
+
+
+_process_pools = {}
+_process_pools_lock = threading.Lock()
+
+
+def rowwise_pool(workers):
+    """
+    Process pool for the row-wise fallback (spawn, like the sheet parsing
+    pool), created on first use and kept, so later columns and exports do
+    not pay for starting interpreters and importing pandas again.
+    """
+    with _process_pools_lock:
+        pool = _process_pools.get(workers)
+        if pool is None:
+            pool = _process_pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return pool
+
+
+@atexit.register
+def _shutdown_rowwise_pools():
+    with _process_pools_lock:
+        for pool in _process_pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _process_pools.clear()
+
+
+def evaluate_rowwise(df, formula, workers=1, progress=None):
+    """
+    Evaluates a formula row by row with asteval.
+    Returns (Series, FormulaErrors or None if no row failed); failed rows
+    are missing values in the Series.
+    Only the columns the formula references are handed to the interpreter.
+    With workers > 1 and at least ROW_WISE_PARALLEL_MIN_ROWS rows, row
+    partitions run in the shared rowwise_pool, each worker with its own
+    Interpreter; the results are put back in row order. Smaller frames are
+    evaluated in this process. progress(done, total) is called as partitions finish.
+    """
+    names = compile_formula(formula).names
+    frame = df[[c for c in df.columns if c in names]]
+    n_rows = len(frame)
+    if workers > 1 and n_rows >= ROW_WISE_PARALLEL_MIN_ROWS:
+        n_parts = max(workers, min(workers * PARTITIONS_PER_WORKER, n_rows // ROW_WISE_PARTITION_ROWS))
+    else:
+        n_parts = max(1, n_rows // ROW_WISE_PARTITION_ROWS) if progress else 1
+        workers = 1
+    edges = np.linspace(0, n_rows, n_parts + 1).astype(np.int64).tolist()
+    bounds = list(zip(edges[:-1], edges[1:]))
+    parts = [None] * len(bounds)
+
+    if workers == 1:
+        # a private interpreter keeps column names from leaking between formulas
+        evaluator = RowEvaluator(formula)
+        for i, (start, stop) in enumerate(bounds):
+            parts[i] = evaluator.values(frame.iloc[start:stop])
+            if progress:
+                progress(i + 1, len(bounds))
+    else:
+        pool = rowwise_pool(workers)
+        futures = {
+            pool.submit(_evaluate_partition, frame.iloc[start:stop], formula): i
+            for i, (start, stop) in enumerate(bounds)
+        }
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                parts[futures[future]] = future.result()
+                if progress:
+                    progress(done, len(bounds))
+        except BrokenProcessPool:
+            with _process_pools_lock:
+                if _process_pools.get(workers) is pool:
+                    del _process_pools[workers]  # a worker died; the next column starts a new pool
+            raise
+        finally:
+            for future in futures:
+                future.cancel()  # the pool is shared: drop partitions of a failed column
+    values, errors = [], FormulaErrors(n_rows)
+    for (start, _), (part, part_errors) in zip(bounds, parts):
+        values.extend(part)
+        errors.extend(part_errors, start)
+    series = pd.Series(values, index=df.index, dtype=None if values else object)
+    return series, (errors if errors.positions else None)
+
+
+def evaluate_column(df, formula, cache=None, binding=None, workers=1, progress=None):
+    """
+    Evaluates a formula over the whole frame.
+    Returns (Series, path, reason, errors): path is VECTORISED when the
+    compiled plan or DataFrame.eval ran, ROW_WISE when asteval had to be
+    applied row by row;
+    errors is a FormulaErrors for the rows that failed, or None.
+    cache / binding enable sub-expression sharing (see SubexpressionCache).
+    With workers > 1, large frames are evaluated on several cores.
+    progress(done, total) follows the partitions of a row-wise evaluation.
+    """
+    plan = compile_formula(formula)
+    try:
+        if workers > 1 and plan.mode == VECTORISED and len(df) >= PARALLEL_MIN_ROWS:
+            return _evaluate_parallel(plan, df, cache, binding, workers), VECTORISED, "", None
+        return plan.evaluate(df, cache, binding), VECTORISED, "", None
+    except Exception as exc:
+        reason = plan.reason or f"{type(exc).__name__}: {exc}"
+    try:
+        return evaluate_pandas(df, formula), VECTORISED, "", None
+    except Exception:
+        pass
+    values, errors = evaluate_rowwise(df, formula, workers, progress)
+    return values, ROW_WISE, reason, errors
+
+
+# ---------------------------------------------------------------------- #
+# Result cache                                                           #
+# ---------------------------------------------------------------------- #
+RESULT_CACHE_MB = 256
+
+_fingerprints = {}  # (id(frame), column) -> (weakref to frame, digest)
+
+
+def column_fingerprint(frame, column):
+    """
+    Content hash of one column, memoised per frame object.
+    Numeric and Arrow buffers are hashed directly; other dtypes via pandas'
+    row hashes.
+    """
+    memo = _fingerprints.get((id(frame), column))
+    if memo is not None and memo[0]() is frame:
+        return memo[1]
+    series = frame[column]
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{series.dtype}|{len(series)}".encode())
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biufcmM":
+        h.update(np.ascontiguousarray(series.to_numpy()).view(np.uint8).data)
+    elif hasattr(series.array, "__arrow_array__"):
+        # Arrow-backed strings: hash the raw buffers (~40x faster than row hashes)
+        arrow = series.array.__arrow_array__()
+        for chunk in getattr(arrow, "chunks", [arrow]):
+            h.update(f"{chunk.offset}|{len(chunk)}".encode())
+            for buffer in chunk.buffers():
+                if buffer is not None:
+                    h.update(buffer)
+    else:
+        h.update(pd.util.hash_pandas_object(series, index=False).to_numpy().data)
+    digest = h.hexdigest()
+    if len(_fingerprints) > 4096:
+        for key in [k for k, (ref, _) in _fingerprints.items() if ref() is None]:
+            del _fingerprints[key]
+    _fingerprints[(id(frame), column)] = (weakref.ref(frame), digest)
+    return digest
+
+
+def result_key(formula, frame, computed=None):
+    """
+    Cache key for a formula over frame: its normalised text plus a
+    fingerprint of every column it reads. computed maps names of formula
+    columns it reads to their own result keys.
+    """
+    computed = computed or {}
+    plan = compile_formula(formula)
+    tokens = []
+    for name in sorted(plan.names):
+        if name in computed:
+            tokens.append((name, "formula", computed[name]))
+        elif name in frame.columns:
+            tokens.append((name, "source", column_fingerprint(frame, name)))
+    raw = repr((plan.normalised, len(frame), tokens)).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """
+    LRU of evaluated formula columns, bounded by their size in bytes.
+    Shared by previews (worker thread) and exports (Tk thread).
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (values, path, reason, errors, nbytes)
+        self._lock = threading.Lock()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[:4]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, values, path, reason, errors=None):
+        nbytes = int(values.memory_usage(index=False, deep=values.dtype == object))
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes_used -= old[4]
+            self._entries[key] = (values, path, reason, errors, nbytes)
+            self.bytes_used += nbytes
+            while self.bytes_used > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes_used -= evicted[4]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self._entries), "bytes": self.bytes_used}
+
+
+result_cache = ResultCache(int(get_setting("result_cache_mb", RESULT_CACHE_MB)) * 1024 ** 2)
+
+
+# Formula previews run on a fixed sample so they cost the same on any sheet size
+PREVIEW_ROWS = 500
+PREVIEW_DEBOUNCE_MS = 150   # idle time after the last keystroke before previewing
+PREVIEW_VALUES = 3
+ROW_WISE_PREVIEW_ROWS = 20  # asteval is slow; only this many sample rows go row by row
+
+
+def preview_sample(df, rows=PREVIEW_ROWS):
+    """
+    Returns a fixed sample of df: the first row plus evenly spaced rows
+    through the rest, so type problems further down still show up.
+    """
+    if df is None or len(df) <= rows:
+        return df
+    positions = np.unique(np.linspace(0, len(df) - 1, rows).astype(np.int64))
+    return df.iloc[positions]
+
+
+def _error_hint(errors):
+    if not errors:
+        return ""
+    return f"  [{len(errors)} error(s) in sample: {errors.first_message}]"
+
+
+def preview_formula(sample, formula, n_values=PREVIEW_VALUES):
+    """
+    Evaluates a formula on a preview sample and returns the label text:
+    the first few values, the path taken and a hint if any rows failed.
     """
     if not formula:
         return ""
-    if df is None or df.empty:
+    if sample is None or sample.empty:
         return "Error: No data loaded"
 
+    plan = compile_formula(formula)
     try:
-        # First, try pandas.eval (faster and generally safe)
-        value = df.eval(formula).dropna().iloc[0]
-        return f"Preview (pandas): {value}"
-    except Exception as pd_eval_err:
-        # If pandas.eval fails, try asteval for the first row
-        try:
-            # Get the first row as a dictionary for context
-            first_row_dict = df.iloc[0].to_dict()
-
-            # Evaluate using asteval, passing the row dict as symbols
-            # Use a fresh interpreter or clear symtable if necessary, but
-            # for previews, reusing might be okay. Be mindful of side effects
-            # if formulas modify the symtable (though not typical here).
-            preview = aeval(formula, symtable=first_row_dict)
-
-            # Check if preview is NaN or None (common results of failed ops)
-            if pd.isna(preview):
-                 return f"Preview (asteval): NaN/None"
-
-            return f"Preview (asteval): {preview}"
-        except Exception as asteval_err:
-            # Both methods failed
-            # Provide a more specific error message if helpful
-            # print(f"Pandas eval error: {pd_eval_err}")
-            # print(f"Asteval error: {asteval_err}")
-            return "Error evaluating formula"
\ No newline at end of file
+        return format_preview(plan.evaluate(sample), VECTORISED, n_values=n_values)
+    except Exception as exc:
+        reason = plan.reason or f"{type(exc).__name__}: {exc}"
+    try:
+        return format_preview(evaluate_pandas(sample, formula), VECTORISED, n_values=n_values)
+    except Exception:
+        values, errors = evaluate_rowwise(sample.iloc[:ROW_WISE_PREVIEW_ROWS], formula)
+        return format_preview(values, ROW_WISE, reason, n_values, errors)
+
+
+def format_preview(values, path, reason="", n_values=PREVIEW_VALUES, errors=None):
+    """
+    Label text for evaluated preview values.
+    """
+    if errors and len(errors) == len(values):
+        return f"Error: {errors.first_message or reason}"
+    shown = [v for v in values.tolist() if not (np.ndim(v) == 0 and pd.isna(v))][:n_values]
+    if not shown:
+        return f"Preview ({path}): NaN/None{_error_hint(errors)}"
+    text = ", ".join(str(v) for v in shown)
+    return f"Preview ({path}): {text}{_error_hint(errors)}"
+
+
+def evaluate_formula(df, col, formula):
+    """
+    Evaluates a formula for preview on a sample of df.
+    """
+    return preview_formula(preview_sample(df), formula)
+
+
+# ---------------------------------------------------------------------- #
+# Benchmark                                                              #
+# ---------------------------------------------------------------------- #
+BENCHMARK_FORMULA = "sum([price * k for k in range(qty % 3)])"  # comprehension → row-wise
+
+
+def benchmark(rows=20_000, width=300, formula=BENCHMARK_FORMULA):
+    """Time the row-wise fallback against apply(axis=1) + evaluate_with_asteval.
+
+    The frame is the readers benchmark frame padded to *width* columns, of
+    which the formula reads two. Returns ``{"RowEvaluator": seconds,
+    "apply + to_dict": seconds}`` and checks both give the same values.
+    """
+    from gui.core.readers import sample_frame
+
+    frame = sample_frame(rows)
+    filler = pd.DataFrame(
+        np.random.default_rng(1).random((rows, max(0, width - frame.shape[1]))), index=frame.index
+    ).add_prefix("filler_")
+    frame = pd.concat([frame, filler], axis=1)
+
+    start = time.perf_counter()
+    interpreter = Interpreter()
+    expected = frame.apply(lambda row: evaluate_with_asteval(row, formula, interpreter), axis=1)
+    timings = {"apply + to_dict": time.perf_counter() - start}
+    start = time.perf_counter()
+    values, _ = evaluate_rowwise(frame, formula)
+    timings["RowEvaluator"] = time.perf_counter() - start
+    pd.testing.assert_series_equal(values, expected, check_dtype=False)
+    return timings
+
+
+if __name__ == "__main__":
+    import sys
+    result = benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
+    for label, seconds in result.items():
+        print(f"{label:>16}: {seconds:.3f}s")
+    print(f"{'speed-up':>16}: {result['apply + to_dict'] / result['RowEvaluator']:.1f}x")
@@ -0,0 +1,228 @@
+# core/formula_graph.py
+"""Dependency graph between column formulas, evaluated in topological order."""
+
+from gui.core.formula_engine import (
+    VECTORISED, referenced_names, evaluate_column, preview_formula, format_preview,
+    compile_formula, SubexpressionCache, result_key, result_cache, eval_workers, preview_sample,
+)
+
+PROBE_ROWS = 1_000  # rows each formula runs on first in fail-fast mode
+
+
+class FormulaCycleError(ValueError):
+    """Raised when column formulas reference each other in a loop."""
+
+    def __init__(self, cycle):
+        self.cycle = cycle
+        super().__init__("circular reference: " + " -> ".join(cycle))
+
+
+class FormulaProbeError(ValueError):
+    """Raised in fail-fast mode when formulas fail on the probe rows."""
+
+    def __init__(self, failures, index):
+        self.failures = failures  # col -> FormulaErrors on the probe rows
+        self.index = index  # row labels of the probe rows
+        super().__init__("\n".join(
+            f"{col}: failed on {len(errors)} of {len(index):,} probe rows\n{errors.describe(index)}"
+            for col, errors in failures.items()
+        ))
+
+
+def dependencies(formulas):
+    """Map each formula column to the other formula columns it reads.
+
+    A formula that names its own column reads the source column, so
+    self-references are not edges.
+    """
+    return {
+        col: sorted(name for name in referenced_names(text) if name in formulas and name != col)
+        for col, text in formulas.items()
+    }
+
+
+def topological_order(formulas, targets=None):
+    """Formula columns needed for *targets* (default: all), upstream first.
+
+    Raises ``FormulaCycleError`` naming the loop if there is one.
+    """
+    deps = dependencies(formulas)
+    order, state = [], {}  # state: 1 = on the current path, 2 = done
+
+    def visit(col, path):
+        if state.get(col) == 2:
+            return
+        if state.get(col) == 1:
+            raise FormulaCycleError(path[path.index(col):] + [col])
+        state[col] = 1
+        for dep in deps[col]:
+            visit(dep, path + [col])
+        state[col] = 2
+        order.append(col)
+
+    for col in (formulas if targets is None else targets):
+        if col in formulas:
+            visit(col, [])
+    return order
+
+
+def downstream(formulas, col):
+    """Formula columns that read *col*, directly or through other formulas.
+
+    *col* itself need not have a formula (e.g. one that was just cleared).
+    """
+    readers = {}
+    for c, text in formulas.items():
+        for name in referenced_names(text):
+            if name != c:
+                readers.setdefault(name, []).append(c)
+    found, stack = [], list(readers.get(col, []))
+    while stack:
+        c = stack.pop()
+        if c not in found and c != col:
+            found.append(c)
+            stack.extend(readers.get(c, []))
+    return found
+
+
+def source_columns(formulas, targets):
+    """Source columns the *targets* read once formula columns are resolved."""
+    needed, seen = set(), set()
+    stack = list(targets)
+    while stack:
+        col = stack.pop()
+        if col in seen:
+            continue
+        seen.add(col)
+        if col not in formulas:
+            needed.add(col)
+            continue
+        for name in referenced_names(formulas[col]):
+            if name == col or name not in formulas:
+                needed.add(name)  # own name → the source column
+            else:
+                stack.append(name)
+    return needed
+
+
+class ColumnResults:
+    """Computed formula columns for one source frame.
+
+    Each column's key covers its formula and the content of everything it
+    reads (source column fingerprints, keys of upstream formula columns), so
+    editing one formula recomputes only that column and whatever reads it.
+    Results are also shared through the engine's bounded ``result_cache``,
+    so re-reading unchanged data does not re-evaluate anything either.
+    ``progress(col, done, total)`` follows row-wise columns partition by
+    partition. With ``fail_fast``, formulas about to be evaluated run on
+    ``PROBE_ROWS`` sample rows first, and ``FormulaProbeError`` is raised
+    before the full frame is touched if any of them fail there.
+    """
+
+    def __init__(self, frame, cache=result_cache, workers=None, progress=None, fail_fast=False):
+        self.frame = frame
+        self.cache = cache
+        self.workers = workers or eval_workers()
+        self.progress = progress
+        self.fail_fast = fail_fast
+        self.entries = {}  # col -> (key, values, path, reason, errors)
+        self.recomputed = []  # columns evaluated by the last evaluate() call
+        self.reused = []  # columns the last evaluate() call took from the result cache
+        self.cse = SubexpressionCache()  # sharing stats of the last evaluate() call
+
+    def frame_with(self, cols):
+        """The source frame with the computed *cols* overlaid."""
+        if not cols:
+            return self.frame
+        frame = self.frame.copy(deep=False)
+        for col in cols:
+            frame[col] = self.entries[col][1]
+        return frame
+
+    def evaluate(self, formulas, targets):
+        """Compute *targets* (and their upstream columns) where out of date.
+
+        Returns ``{col: (values, path, reason, errors)}`` for the formula
+        columns among *targets*; errors is a ``FormulaErrors`` or None.
+        """
+        deps = dependencies(formulas)
+        order = topological_order(formulas, targets)
+        keys = {}
+        for col in order:
+            keys[col] = result_key(formulas[col], self.frame, {d: keys[d] for d in deps[col]})
+
+        self.recomputed, self.reused = [], []
+        stale = []
+        for col in order:
+            entry = self.entries.get(col)
+            if entry is not None and entry[0] == keys[col]:
+                continue
+            cached = self.cache.get(keys[col]) if self.cache is not None else None
+            if cached is not None:
+                values, path, reason, errors = cached
+                if not values.index.equals(self.frame.index):
+                    values = values.set_axis(self.frame.index)
+                self.entries[col] = (keys[col], values, path, reason, errors)
+                self.reused.append(col)
+            else:
+                stale.append(col)
+
+        if self.fail_fast and stale and len(self.frame) > PROBE_ROWS:
+            self._probe(formulas, stale)
+
+        # count sub-expressions over everything about to run, then share repeats
+        cache = SubexpressionCache()
+        bindings = {col: self._binding(deps[col]) for col in stale}
+        for col in stale:
+            cache.add(compile_formula(formulas[col]), bindings[col])
+
+        for col in stale:
+            values, path, reason, errors = evaluate_column(
+                self.frame_with(deps[col]), formulas[col], cache, bindings[col], self.workers,
+                self._column_progress(col),
+            )
+            self.entries[col] = (keys[col], values, path, reason, errors)
+            if self.cache is not None:
+                self.cache.put(keys[col], values, path, reason, errors)
+            self.recomputed.append(col)
+        self.cse = cache
+        return {col: self.entries[col][1:] for col in targets if col in formulas}
+
+    def _probe(self, formulas, cols):
+        probe = ColumnResults(preview_sample(self.frame, PROBE_ROWS), cache=None, workers=1)
+        computed = probe.evaluate(formulas, cols)
+        failures = {col: computed[col][3] for col in cols if computed[col][3]}
+        if failures:
+            raise FormulaProbeError(failures, probe.frame.index)
+
+    def _column_progress(self, col):
+        if self.progress is None:
+            return None
+        return lambda done, total: self.progress(col, done, total)
+
+    @staticmethod
+    def _binding(deps):
+        # within one evaluate() call every formula column is computed once,
+        # so its name identifies the data; everything else is the source frame
+        deps = set(deps)
+        return lambda name: ("formula", name) if name in deps else ("source", name)
+
+
+def preview_column(results, formulas, col):
+    """Preview label text for *col*, with upstream formula columns resolved.
+
+    Vectorised formulas go through ``results`` (and so the result cache);
+    row-wise ones are previewed on the first few sample rows only.
+    """
+    formula = formulas.get(col, "")
+    if not formula or results.frame is None or results.frame.empty:
+        return preview_formula(results.frame, formula)
+    try:
+        if compile_formula(formula).mode == VECTORISED:
+            values, path, reason, errors = results.evaluate(formulas, [col])[col]
+            return format_preview(values, path, reason, errors=errors)
+        upstream = [c for c in topological_order(formulas, [col]) if c != col]
+        results.evaluate(formulas, upstream)
+    except FormulaCycleError as exc:
+        return f"Error: {exc}"
+    return preview_formula(results.frame_with(dependencies(formulas)[col]), formula)
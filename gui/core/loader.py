@@ -1,4 +1,117 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 
-def load_excel_sheet(file_path, sheet_name, header_row):
-    return pd.read_excel(file_path, sheet_name=sheet_name, header=header_row)
+from gui.core.readers import read_sheet, select_backend, parse_rows, is_workbook
+from gui.core import fast_xlsx  # noqa: F401  (registers the built-in "fast-xlsx" backend)
+
+PROBE_ROWS = 200  # rows read by the schema probe before the full load
+PARSE_WORKERS = 2  # sheet-parsing processes unless the parse_workers setting asks for more
+
+# file dialog filters shared by the main and reference pickers
+FILE_TYPES = [
+    ("Data files", "*.xlsx *.xlsm *.xls *.csv *.tsv *.txt *.parquet *.pq *.feather *.arrow"),
+    ("Excel files", "*.xlsx *.xlsm *.xls"),
+    ("Delimited text", "*.csv *.tsv *.txt"),
+    ("Parquet / Feather", "*.parquet *.pq *.feather *.arrow"),
+    ("All files", "*.*"),
+]
+
+
+def load_excel_sheet(file_path, sheet_name, header_row, cache=None, usecols=None):
+    """Read one sheet (or a CSV / Parquet / Feather file); *cache* is an optional ``SheetDiskCache``.
+
+    *usecols* limits the read to those column names (projection pushdown).
+    """
+    def read():
+        return read_sheet(file_path, sheet_name, header=header_row, usecols=usecols)
+
+    if cache is None:
+        return read()
+    return cache.load(file_path, sheet_name, header_row, read, columns=usecols)
+
+
+def load_reference_sheet(file_path, sheet_name, ref_key, ref_cols, cache=None):
+    """Read just the join key and the requested columns of a reference sheet."""
+    columns = list(dict.fromkeys([ref_key] + list(ref_cols)))
+    return load_excel_sheet(file_path, sheet_name, 0, cache=cache, usecols=columns)
+
+
+def probe_excel_sheet(file_path, sheet_name, header_row, nrows=PROBE_ROWS, book=None):
+    """Read only the header plus the first *nrows* data rows of a sheet.
+
+    Used to populate the column controls quickly; the full sheet is loaded
+    afterwards (or at export time).
+    """
+    return read_sheet(file_path, sheet_name, header=header_row, nrows=nrows, book=book)
+
+
+def load_raw_grid(file_path, sheet_name, book=None):
+    """Read a sheet's unconverted cells with no header so the grid can be re-sliced later.
+
+    *book* is an optional already opened ``pd.ExcelFile`` for *file_path*.
+    """
+    return read_sheet(file_path, sheet_name, header=None, book=book)
+
+
+def list_sheets(file_path, book=None):
+    """Sheet names of a workbook; single-table formats expose one pseudo-sheet."""
+    if not is_workbook(file_path):
+        return [os.path.basename(file_path)]
+    return list((book or open_workbook(file_path)).sheet_names)
+
+
+def open_workbook(file_path):
+    """Open *file_path* as a ``pd.ExcelFile`` using the selected backend's engine."""
+    return pd.ExcelFile(file_path, engine=select_backend(file_path).engine)
+
+
+def read_sheet_timed(file_path, sheet_name, header_row=None):
+    """Process-pool worker: read one sheet and return ``(df, seconds)``."""
+    start = time.perf_counter()
+    df = read_sheet(file_path, sheet_name, header=header_row)
+    return df, time.perf_counter() - start
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def sheet_pool(max_workers=None):
+    """The process pool sheets are parsed on, created on first use and kept.
+
+    Opening another file reuses its processes instead of spawning a new set;
+    the pool has *max_workers* (default ``PARSE_WORKERS``) processes, at
+    most one per core.
+    """
+    workers = max(1, min(max_workers or PARSE_WORKERS, os.cpu_count() or 1))
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            # "spawn" keeps workers clear of the Tk state in the parent process
+            pool = _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return pool
+
+
+def discard_sheet_pool(pool):
+    """Forget a pool whose worker died, so the next prefetch starts a new one."""
+    with _pools_lock:
+        for workers in [w for w, p in _pools.items() if p is pool]:
+            del _pools[workers]
+
+
+def frame_from_grid(grid, header_row):
+    """Turn a raw grid into a DataFrame using *header_row* as the header.
+
+    Goes through the same conversion as ``pd.read_excel(header=header_row)``,
+    so a re-sliced grid has the dtypes a fresh read of the sheet would have.
+    """
+    if header_row >= len(grid):
+        raise ValueError(f"Header row {header_row} is beyond the end of the sheet ({len(grid)} rows).")
+    return parse_rows(grid.astype(object).values.tolist(), header_row)
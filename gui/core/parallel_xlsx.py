@@ -0,0 +1,458 @@
+# core/parallel_xlsx.py
+"""XLSX writer that renders and compresses sheet XML in row ranges across processes.
+
+Each worker turns a range of rows into ``<row>`` XML (strings inline, so no
+shared-strings table has to be merged) and deflates it as a raw stream that
+ends on a byte boundary. The parent appends the pieces in row order, so the
+sheet part is one valid deflate stream, combines the CRCs and writes the
+package with a small zip writer of its own.
+"""
+
+import datetime
+import multiprocessing
+import os
+import re
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from gui.core.config_manager import get_setting
+
+PART_ROWS = 20_000             # rows rendered and compressed per task
+PARALLEL_MIN_ROWS = 100_000    # below this, starting processes costs more than it saves
+COMPRESS_LEVEL = 6
+SHEET_NAME = "Sheet1"
+
+# cellXfs indices in styles.xml
+STYLE_DATETIME, STYLE_DATE, STYLE_DURATION, STYLE_HEADER = 1, 2, 3, 4
+
+_EPOCH = np.datetime64("1899-12-30", "ns")
+_ILLEGAL_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
+
+def export_workers():
+    """Process count for rendering (export_workers setting, default: all cores)."""
+    return max(1, int(get_setting("export_workers", 0) or os.cpu_count() or 1))
+
+
+def column_letter(index):
+    """0 → "A", 25 → "Z", 26 → "AA"."""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+# ---------------------------------------------------------------------- #
+# Cell rendering                                                         #
+# ---------------------------------------------------------------------- #
+def _text(value):
+    if _ILLEGAL_XML.search(value):
+        raise ValueError(f"{value!r} contains characters that cannot be stored in a worksheet")
+    value = value.translate(_ESCAPE)
+    if value[:1].isspace() or value[-1:].isspace():
+        return f'<is><t xml:space="preserve">{value}</t></is>'
+    return f"<is><t>{value}</t></is>"
+
+
+def _serial(value):
+    """Excel serial day number of a date/datetime, as openpyxl computes it."""
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    delta = value.replace(tzinfo=None) - datetime.datetime(1899, 12, 30)
+    days = delta.days
+    if 0 < days <= 60:
+        days -= 1  # Excel counts the non-existent 1900-02-29
+    return days + delta.seconds / 86400 + delta.microseconds / 86400e6
+
+
+def _cell(ref, value):
+    """XML for one cell of an object column ("" for an empty cell)."""
+    if value is None or value is pd.NaT or value is pd.NA:
+        return ""
+    if isinstance(value, str):
+        return f'<c r="{ref}" t="inlineStr">{_text(value)}</c>'
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, np.integer)):
+        return f'<c r="{ref}"><v>{int(value)}</v></c>'
+    if isinstance(value, (float, np.floating)):
+        if value != value:
+            return ""
+        if value in (float("inf"), float("-inf")):
+            return f'<c r="{ref}" t="inlineStr">{_text("inf" if value > 0 else "-inf")}</c>'
+        return f'<c r="{ref}"><v>{float(value)!r}</v></c>'
+    if isinstance(value, datetime.datetime):
+        return f'<c r="{ref}" s="{STYLE_DATETIME}"><v>{_serial(value)!r}</v></c>'
+    if isinstance(value, datetime.date):
+        return f'<c r="{ref}" s="{STYLE_DATE}"><v>{_serial(value)!r}</v></c>'
+    if isinstance(value, datetime.timedelta):
+        return f'<c r="{ref}" s="{STYLE_DURATION}"><v>{value / datetime.timedelta(days=1)!r}</v></c>'
+    raise ValueError(f"Cannot convert {value!r} to Excel")
+
+
+def _numbers(values, mask, letter, rows, style=""):
+    # one <c> per row; masked rows are empty cells
+    return [
+        "" if skip else f'<c r="{letter}{r}"{style}><v>{v!r}</v></c>'
+        for v, skip, r in zip(values, mask, rows)
+    ]
+
+
+def column_cells(series, letter, first_row):
+    """Cell XML for every value of *series*, the first on sheet row *first_row*."""
+    rows = range(first_row, first_row + len(series))
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype):
+        if dtype.kind == "b":
+            return [f'<c r="{letter}{r}" t="b"><v>{int(v)}</v></c>' for v, r in zip(series.tolist(), rows)]
+        if dtype.kind in "iu":
+            return [f'<c r="{letter}{r}"><v>{v}</v></c>' for v, r in zip(series.tolist(), rows)]
+        if dtype.kind == "f":
+            arr = series.to_numpy(dtype=np.float64)
+            finite = np.isfinite(arr)
+            if finite.all():
+                return _numbers(arr.tolist(), [False] * len(arr), letter, rows)
+            return [_cell(f"{letter}{r}", v) for v, r in zip(arr.tolist(), rows)]
+        if dtype.kind == "M":
+            arr = series.to_numpy()
+            days = (arr - _EPOCH) / np.timedelta64(1, "D")
+            days = np.where((days > 0) & (days < 61), days - 1, days)
+            return _numbers(days.tolist(), np.isnat(arr).tolist(), letter, rows, f' s="{STYLE_DATETIME}"')
+        if dtype.kind == "m":
+            arr = series.to_numpy()
+            days = arr / np.timedelta64(1, "D")
+            return _numbers(days.tolist(), np.isnat(arr).tolist(), letter, rows, f' s="{STYLE_DURATION}"')
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return column_cells(series.dt.tz_localize(None), letter, first_row)
+    values = series.astype(object).to_numpy()
+    missing = series.isna().to_numpy()
+    return ["" if skip else _cell(f"{letter}{r}", v) for v, skip, r in zip(values, missing, rows)]
+
+
+def render_rows(frame, first_row):
+    """``<row>`` XML for every row of *frame*, the first on sheet row *first_row*."""
+    columns = [
+        column_cells(frame.iloc[:, i], column_letter(i), first_row)
+        for i in range(frame.shape[1])
+    ]
+    return "".join(
+        f'<row r="{r}">{"".join(cells)}</row>'
+        for r, cells in enumerate(zip(*columns), first_row)
+    )
+
+
+def header_row(columns):
+    cells = "".join(
+        f'<c r="{column_letter(i)}1" s="{STYLE_HEADER}" t="inlineStr">{_text(str(name))}</c>'
+        for i, name in enumerate(columns)
+    )
+    return f'<row r="1">{cells}</row>'
+
+
+def deflate_part(data, final=False, level=COMPRESS_LEVEL):
+    """(raw deflate bytes, crc32, length) of *data*.
+
+    Non-final parts end with a sync flush, so parts compressed separately
+    can be concatenated into a single deflate stream.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    out = compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+    return out, zlib.crc32(data), len(data)
+
+
+def render_part(frame, first_row, level=COMPRESS_LEVEL):
+    """Worker entry point: render and compress one row range."""
+    return deflate_part(render_rows(frame, first_row).encode("utf-8"), level=level)
+
+
+# ---------------------------------------------------------------------- #
+# CRC-32 of concatenated data                                            #
+# ---------------------------------------------------------------------- #
+def _gf2_times(matrix, vector):
+    total, i = 0, 0
+    while vector:
+        if vector & 1:
+            total ^= matrix[i]
+        vector >>= 1
+        i += 1
+    return total
+
+
+def _gf2_square(matrix):
+    return [_gf2_times(matrix, row) for row in matrix]
+
+
+def crc32_combine(crc1, crc2, len2):
+    """CRC-32 of A + B from crc32(A), crc32(B) and len(B) (zlib's crc32_combine)."""
+    if len2 <= 0:
+        return crc1
+    odd = [0xEDB88320] + [1 << n for n in range(31)]  # operator for one zero bit
+    even = _gf2_square(odd)   # two zero bits
+    odd = _gf2_square(even)   # four zero bits
+    while True:
+        even = _gf2_square(odd)
+        if len2 & 1:
+            crc1 = _gf2_times(even, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+        odd = _gf2_square(even)
+        if len2 & 1:
+            crc1 = _gf2_times(odd, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+    return crc1 ^ crc2
+
+
+# ---------------------------------------------------------------------- #
+# Zip container                                                          #
+# ---------------------------------------------------------------------- #
+_MAX32 = 0xFFFFFFFF
+ZIP64_LIMIT = _MAX32  # sizes and offsets from here on need ZIP64 records
+
+
+class ZipWriter:
+    """Minimal zip writer for members whose deflate data is produced elsewhere."""
+
+    def __init__(self, fileobj):
+        self.fp = fileobj
+        self.entries = []  # (name, crc, compressed size, size, offset)
+        now = time.localtime()
+        self._time = (now.tm_hour << 11) | (now.tm_min << 5) | (now.tm_sec // 2)
+        self._date = ((now.tm_year - 1980) << 9) | (now.tm_mon << 5) | now.tm_mday
+
+    def write(self, name, data):
+        """Add a member compressed here."""
+        compressed, crc, size = deflate_part(data, final=True)
+        self.write_compressed(name, crc, size, len(compressed), [compressed])
+
+    def write_compressed(self, name, crc, size, compressed_size, chunks):
+        """Add a member from already deflated *chunks* (bytes or file objects)."""
+        offset = self.fp.tell()
+        name_bytes = name.encode("utf-8")
+        zip64 = size >= ZIP64_LIMIT or compressed_size >= ZIP64_LIMIT
+        extra = struct.pack("<HHQQ", 1, 16, size, compressed_size) if zip64 else b""
+        self.fp.write(struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, 45 if zip64 else 20, 0x800, 8, self._time, self._date, crc,
+            _MAX32 if zip64 else compressed_size, _MAX32 if zip64 else size,
+            len(name_bytes), len(extra),
+        ))
+        self.fp.write(name_bytes + extra)
+        for chunk in chunks:
+            if isinstance(chunk, bytes):
+                self.fp.write(chunk)
+            else:
+                shutil.copyfileobj(chunk, self.fp, 1024 * 1024)
+        self.entries.append((name_bytes, crc, compressed_size, size, offset))
+
+    def close(self):
+        start = self.fp.tell()
+        for name, crc, csize, size, offset in self.entries:
+            # values too large for 32 bits move to the ZIP64 extra field, in this order
+            fields = [v for v in (size, csize, offset) if v >= ZIP64_LIMIT]
+            extra = struct.pack(f"<HH{len(fields)}Q", 1, 8 * len(fields), *fields) if fields else b""
+            size32, csize32, offset32 = (_MAX32 if v >= ZIP64_LIMIT else v for v in (size, csize, offset))
+            self.fp.write(struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014B50, 45, 45 if fields else 20, 0x800, 8,
+                self._time, self._date, crc, csize32, size32,
+                len(name), len(extra), 0, 0, 0, 0, offset32,
+            ))
+            self.fp.write(name + extra)
+        end = self.fp.tell()
+        count, cd_size = len(self.entries), end - start
+        zip64 = start >= ZIP64_LIMIT or cd_size >= ZIP64_LIMIT or count >= 0xFFFF
+        if zip64:
+            self.fp.write(struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0,
+                                      count, count, cd_size, start))
+            self.fp.write(struct.pack("<IIQI", 0x07064B50, 0, end, 1))
+        self.fp.write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+                                  _MAX32 if zip64 else cd_size, _MAX32 if zip64 else start, 0))
+
+
+# ---------------------------------------------------------------------- #
+# Package parts                                                          #
+# ---------------------------------------------------------------------- #
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">\
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>\
+<Default Extension="xml" ContentType="application/xml"/>\
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>\
+{sheets}\
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>\
+</Types>"""
+_CONTENT_TYPE_SHEET = """<Override PartName="/xl/worksheets/sheet{n}.xml" \
+ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>"""
+
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">\
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>\
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" \
+xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">\
+<sheets>{sheets}</sheets></workbook>"""
+_WORKBOOK_SHEET = """<sheet name="{name}" sheetId="{n}" r:id="rId{n}"/>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">\
+{sheets}\
+<Relationship Id="rId{styles}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>\
+</Relationships>"""
+_WORKBOOK_REL_SHEET = """<Relationship Id="rId{n}" \
+Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet{n}.xml"/>"""
+
+# cellXfs: general, datetime, date, duration, header (bold, thin border, centred)
+_STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">\
+<numFmts count="3"><numFmt numFmtId="164" formatCode="yyyy-mm-dd h:mm:ss"/>\
+<numFmt numFmtId="165" formatCode="yyyy-mm-dd"/><numFmt numFmtId="166" formatCode="[hh]:mm:ss"/></numFmts>\
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>\
+<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>\
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>\
+<borders count="2"><border><left/><right/><top/><bottom/><diagonal/></border>\
+<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border></borders>\
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>\
+<cellXfs count="5"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>\
+<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>\
+<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>\
+<xf numFmtId="166" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>\
+<xf numFmtId="0" fontId="1" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" applyAlignment="1">\
+<alignment horizontal="center" vertical="top"/></xf></cellXfs>\
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles></styleSheet>"""
+
+_SHEET_START = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">\
+<dimension ref="{ref}"/><sheetData>"""
+
+_SHEET_END = "</sheetData></worksheet>"
+
+
+def _sheet_title(name):
+    name = re.sub(r"[\[\]:*?/\\]", "_", str(name))[:31] or SHEET_NAME
+    return name.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def render_pool(workers):
+    """The process pool every write in progress renders on.
+
+    Writes running at the same time (shard files, "Also save as" targets)
+    queue their row ranges on this one pool, so together they never use
+    more than *workers* processes.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return pool
+
+
+def _parts(tasks, workers, level):
+    """(deflate bytes, crc, length) for each (frame, first row) task, in order."""
+    if workers <= 1:
+        for frame, first_row in tasks:
+            yield render_part(frame, first_row, level)
+        return
+    pool = render_pool(workers)
+    pending = []
+    try:
+        # keep a couple of ranges per worker in flight so memory stays bounded
+        for frame, first_row in tasks:
+            pending.append(pool.submit(render_part, frame, first_row, level))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        while pending:
+            yield pending.pop(0).result()
+    except BrokenProcessPool:
+        with _pools_lock:
+            if _pools.get(workers) is pool:
+                del _pools[workers]  # a worker died; the next write starts a new pool
+        raise
+    finally:
+        for future in pending:
+            future.cancel()  # the write failed or was abandoned
+
+
+def write_xlsx(frame, path, progress=None, sheet_name=SHEET_NAME, workers=None, level=COMPRESS_LEVEL):
+    """Write *frame* (header row plus values) as a single-sheet .xlsx file."""
+    write_workbook([(sheet_name, frame)], path, progress, workers, level)
+
+
+def write_workbook(sheets, path, progress=None, workers=None, level=COMPRESS_LEVEL):
+    """Write each (name, frame) in *sheets* to its own sheet of one .xlsx file.
+
+    The row ranges of all sheets share one process pool, so several
+    sheets are rendered in parallel as well.
+    """
+    total = sum(len(frame) for _, frame in sheets)
+    if workers is None:
+        workers = export_workers() if total >= PARALLEL_MIN_ROWS else 1
+    tasks, owners = [], []  # (row range, first sheet row), index of its sheet
+    for n, (_, frame) in enumerate(sheets):
+        for start in range(0, len(frame), PART_ROWS):
+            tasks.append((frame.iloc[start:start + PART_ROWS], start + 2))
+            owners.append(n)
+
+    spools = [tempfile.TemporaryFile() for _ in sheets]
+    try:
+        members = []  # [crc, size] per sheet
+        for (_, frame), spool in zip(sheets, spools):
+            last_cell = f"{column_letter(max(frame.shape[1], 1) - 1)}{len(frame) + 1}"
+            head, crc, size = deflate_part(
+                (_SHEET_START.format(ref=f"A1:{last_cell}") + header_row(frame.columns)).encode("utf-8"),
+                level=level,
+            )
+            spool.write(head)
+            members.append([crc, size])
+        done = 0
+        for (part_frame, _), n, (data, part_crc, part_size) in zip(tasks, owners, _parts(tasks, workers, level)):
+            spools[n].write(data)
+            members[n] = [crc32_combine(members[n][0], part_crc, part_size), members[n][1] + part_size]
+            done += len(part_frame)
+            if progress:
+                progress(done, total)
+        tail, tail_crc, tail_size = deflate_part(_SHEET_END.encode("utf-8"), final=True, level=level)
+        for member, spool in zip(members, spools):
+            spool.write(tail)
+            member[:] = [crc32_combine(member[0], tail_crc, tail_size), member[1] + tail_size]
+
+        numbers = range(1, len(sheets) + 1)
+        with open(path, "wb") as fp:
+            package = ZipWriter(fp)
+            package.write("[Content_Types].xml", _CONTENT_TYPES.format(
+                sheets="".join(_CONTENT_TYPE_SHEET.format(n=n) for n in numbers)).encode("utf-8"))
+            package.write("_rels/.rels", _ROOT_RELS.encode("utf-8"))
+            package.write("xl/workbook.xml", _WORKBOOK.format(sheets="".join(
+                _WORKBOOK_SHEET.format(name=_sheet_title(name), n=n)
+                for n, (name, _) in zip(numbers, sheets))).encode("utf-8"))
+            package.write("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS.format(
+                sheets="".join(_WORKBOOK_REL_SHEET.format(n=n) for n in numbers),
+                styles=len(sheets) + 1).encode("utf-8"))
+            package.write("xl/styles.xml", _STYLES.encode("utf-8"))
+            for n, (crc, size), spool in zip(numbers, members, spools):
+                compressed_size = spool.tell()
+                spool.seek(0)
+                package.write_compressed(f"xl/worksheets/sheet{n}.xml", crc, size, compressed_size, [spool])
+            package.close()
+    finally:
+        for spool in spools:
+            spool.close()
@@ -0,0 +1,123 @@
+# core/preview_scheduler.py
+"""Single-worker, latest-wins queue that evaluates formula previews off the Tk thread."""
+
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+POLL_MS = 10       # previews are short, so poll faster than background loads
+HISTORY = 500      # latency samples kept for the p50/p95 figures
+
+
+class PreviewScheduler:
+    """Evaluate previews one at a time on a daemon thread.
+
+    Each key (column) has at most one pending request: submitting again
+    replaces the queued one, and a result whose request was superseded while
+    it ran is dropped instead of delivered.  ``deliver(key, result, args)``
+    always runs on the Tk thread.  A running evaluation cannot be
+    interrupted, but it is never shown once newer text has been submitted.
+    """
+
+    def __init__(self, root, evaluate, deliver, on_idle=None):
+        self.root = root
+        self.evaluate = evaluate
+        self.deliver = deliver
+        self.on_idle = on_idle
+        self._cond = threading.Condition()
+        self._pending: dict = {}    # key -> (seq, submitted at, args); insertion order = FIFO
+        self._latest: dict = {}     # key -> seq of the newest request (Tk thread only)
+        self._busy = False
+        self._seq = itertools.count()
+        self._results = queue.SimpleQueue()
+        self._thread = None
+        self._polling = False
+        self.latency = deque(maxlen=HISTORY)   # submit -> delivered, seconds
+        self.eval_time = deque(maxlen=HISTORY)  # time spent in evaluate(), seconds
+        self.dropped = 0
+
+    # ------------------------------------------------------------------ #
+    # Tk thread                                                          #
+    # ------------------------------------------------------------------ #
+    def submit(self, key, *args) -> None:
+        """Queue ``evaluate(*args)`` for *key*, replacing any queued request."""
+        seq = next(self._seq)
+        self._latest[key] = seq
+        with self._cond:
+            if self._pending.pop(key, None) is not None:
+                self.dropped += 1
+            self._pending[key] = (seq, time.perf_counter(), args)
+            self._cond.notify()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self._poll)
+
+    def cancel(self, key=None) -> None:
+        """Forget queued and running requests for *key* (all keys if None)."""
+        keys = list(self._latest) if key is None else [key]
+        with self._cond:
+            for k in keys:
+                self._pending.pop(k, None)
+        for k in keys:
+            self._latest.pop(k, None)
+
+    def _poll(self) -> None:
+        while True:
+            try:
+                key, seq, submitted, elapsed, result, args = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self.eval_time.append(elapsed)
+            if self._latest.get(key) != seq:
+                self.dropped += 1
+                continue
+            del self._latest[key]
+            self.latency.append(time.perf_counter() - submitted)
+            self.deliver(key, result, args)
+        with self._cond:
+            outstanding = self._busy or bool(self._pending)
+        if outstanding or not self._results.empty():
+            self.root.after(POLL_MS, self._poll)
+            return
+        self._polling = False
+        if self.on_idle:
+            self.on_idle()
+
+    def stats(self) -> dict:
+        """p50/p95 of delivered-preview latency and evaluation time, in ms."""
+        def pct(samples, q):
+            return float(np.percentile(samples, q)) * 1000 if samples else 0.0
+        return {
+            "count": len(self.latency),
+            "p50_ms": pct(self.latency, 50),
+            "p95_ms": pct(self.latency, 95),
+            "eval_p50_ms": pct(self.eval_time, 50),
+            "eval_p95_ms": pct(self.eval_time, 95),
+            "dropped": self.dropped,
+        }
+
+    # ------------------------------------------------------------------ #
+    # Worker thread                                                      #
+    # ------------------------------------------------------------------ #
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._busy = False
+                    self._cond.wait()
+                key = next(iter(self._pending))
+                seq, submitted, args = self._pending.pop(key)
+                self._busy = True
+            start = time.perf_counter()
+            try:
+                result = self.evaluate(*args)
+            except Exception as exc:
+                result = f"Error: {exc}"
+            self._results.put((key, seq, submitted, time.perf_counter() - start, result, args))
@@ -0,0 +1,387 @@
+# core/readers.py
+"""Registry of spreadsheet reader backends with throughput-based auto-selection."""
+
+import csv
+import datetime
+import importlib.util
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+
+from gui.core.config_manager import get_setting, set_setting
+
+SETTINGS_KEY = "reader_backends"
+
+
+class ReaderBackend:
+    """One way of turning a sheet into a DataFrame.
+
+    ``read(path, sheet_name, header, nrows, usecols, book)`` must honour
+    *header* (row index or None), *nrows* (data rows after the header) and
+    *usecols* (list of column names) whenever the matching ``supports_*``
+    flag is set.  *book* is an optional open ``pd.ExcelFile`` for the path.
+    With a header row, values are converted the way ``pd.read_excel``
+    converts them; ``header=None`` returns the unconverted cell grid, which
+    ``parse_rows`` turns into the same frame for any header row later.
+    """
+
+    def __init__(self, name, formats, read, available=True, engine=None,
+                 supports_nrows=True, supports_usecols=True, streaming=False):
+        self.name = name
+        self.formats = tuple(formats)
+        self.read = read
+        self.available = available
+        self.engine = engine  # pandas engine name, if the backend goes through pd.read_excel
+        self.supports_nrows = supports_nrows
+        self.supports_usecols = supports_usecols
+        self.streaming = streaming
+
+    def can(self, ext, nrows=False, usecols=False) -> bool:
+        return (self.available and ext in self.formats
+                and (not nrows or self.supports_nrows)
+                and (not usecols or self.supports_usecols))
+
+    def __repr__(self):
+        return f"ReaderBackend({self.name!r})"
+
+
+_BACKENDS: dict[str, ReaderBackend] = {}
+
+
+def register_backend(backend: ReaderBackend) -> ReaderBackend:
+    """Add (or replace) a backend; registry order is the fallback when nothing is calibrated."""
+    _BACKENDS[backend.name] = backend
+    return backend
+
+
+def available_backends(ext=None) -> list[ReaderBackend]:
+    return [b for b in _BACKENDS.values() if b.available and (ext is None or ext in b.formats)]
+
+
+def get_backend(name) -> ReaderBackend:
+    return _BACKENDS[name]
+
+
+# ---------------------------------------------------------------------- #
+# Shared helpers                                                         #
+# ---------------------------------------------------------------------- #
+def header_names(values):
+    """Build column labels the way ``pd.read_excel`` does for a header row."""
+    names, seen = [], {}
+    for i, value in enumerate(values):
+        name = f"Unnamed: {i}" if pd.isna(value) else value
+        if name in seen:
+            seen[name] += 1
+            deduped = f"{name}.{seen[name]}"
+            while deduped in seen:
+                seen[name] += 1
+                deduped = f"{name}.{seen[name]}"
+            seen[deduped] = 0
+            name = deduped
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def parse_rows(rows, header=0):
+    """DataFrame from lists of raw cell values, converted exactly as ``pd.read_excel`` does.
+
+    Header labels, missing-value strings and numeric-looking text all go
+    through pandas' own ``TextParser``, so every read path agrees on dtypes.
+    """
+    rows = [["" if _missing(v) else v for v in row] for row in rows]
+    try:
+        return TextParser(rows, header=header, skip_blank_lines=False).read()
+    except EmptyDataError:
+        return pd.DataFrame()
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NaT
+
+
+def convert_text_columns(df):
+    """Apply ``pd.read_excel``'s value conversion to the text columns of *df*.
+
+    For readers that decode typed cells themselves: only columns holding
+    text can convert differently (e.g. "001" → 1, "NA" → NaN).
+    """
+    for i in range(df.shape[1]):
+        col = df.iloc[:, i]
+        text = col.dtype == object or isinstance(col.dtype, pd.StringDtype)
+        if text and any(isinstance(v, str) for v in col):
+            converted = parse_rows([[v] for v in col.tolist()], header=None)
+            df.isetitem(i, converted.iloc[:, 0].set_axis(df.index) if len(converted) else col)
+    return df
+
+
+def frame_from_rows(rows, header=0, usecols=None):
+    """Build a DataFrame from row tuples, applying header / usecols like pandas.
+
+    With ``header=None`` the cells are returned unconverted (see ``ReaderBackend``).
+    """
+    rows = list(rows)
+    while rows and all(v is None for v in rows[-1]):
+        rows.pop()  # trailing blank rows, as the pandas readers drop them
+    width = max((len(r) for r in rows), default=0)
+    if header is None:
+        df = pd.DataFrame.from_records(rows, columns=range(width)) if rows else pd.DataFrame()
+        return df.astype(object).fillna(np.nan)
+    if header >= len(rows):
+        return pd.DataFrame()
+    df = parse_rows([list(r) + [None] * (width - len(r)) for r in rows], header)
+    if usecols is not None:
+        wanted = set(usecols)
+        df = df[[c for c in df.columns if c in wanted]]
+    return df
+
+
+def file_ext(path) -> str:
+    return os.path.splitext(str(path))[1].lower()
+
+
+def _usecols_filter(usecols):
+    # a callable tolerates names that are missing from the sheet
+    if usecols is None:
+        return None
+    wanted = set(usecols)
+    return lambda name: name in wanted
+
+
+def _installed(module) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+# ---------------------------------------------------------------------- #
+# Built-in backends                                                      #
+# ---------------------------------------------------------------------- #
+def _pandas_reader(engine):
+    def read(path, sheet_name, header=0, nrows=None, usecols=None, book=None):
+        source = book if book is not None and book.engine == engine else path
+        return pd.read_excel(source, sheet_name=sheet_name, header=header, nrows=nrows,
+                             usecols=_usecols_filter(usecols), engine=engine,
+                             dtype=object if header is None else None)
+    return read
+
+
+def _read_openpyxl_readonly(path, sheet_name, header=0, nrows=None, usecols=None, book=None):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if isinstance(sheet_name, str) else wb.worksheets[sheet_name]
+        max_row = None
+        if nrows is not None:
+            max_row = nrows if header is None else header + 1 + nrows
+        rows = list(ws.iter_rows(values_only=True, max_row=max_row))
+    finally:
+        wb.close()
+    return frame_from_rows(rows, header, usecols)
+
+
+register_backend(ReaderBackend(
+    "openpyxl", (".xlsx", ".xlsm"), _pandas_reader("openpyxl"),
+    available=_installed("openpyxl"), engine="openpyxl",
+))
+register_backend(ReaderBackend(
+    "openpyxl-readonly", (".xlsx", ".xlsm"), _read_openpyxl_readonly,
+    available=_installed("openpyxl"), streaming=True,
+))
+register_backend(ReaderBackend(
+    "xlrd", (".xls",), _pandas_reader("xlrd"),
+    available=_installed("xlrd"), engine="xlrd",
+))
+# Rust-based reader, used automatically when python-calamine is installed
+register_backend(ReaderBackend(
+    "calamine", (".xlsx", ".xlsm", ".xls", ".xlsb", ".ods"), _pandas_reader("calamine"),
+    available=_installed("python_calamine"), engine="calamine",
+))
+
+
+# ---------------------------------------------------------------------- #
+# Delimited text and columnar files (no sheets; *sheet_name* is ignored)  #
+# ---------------------------------------------------------------------- #
+TEXT_FORMATS = (".csv", ".tsv", ".txt")
+COLUMNAR_FORMATS = (".parquet", ".pq", ".feather", ".arrow")
+HAVE_ARROW = _installed("pyarrow")
+
+
+# pyarrow infers timestamps and dates from ISO text where the C engine (used
+# for nrows samples) keeps the text: a timestamp format that never matches
+# turns the first off, and date32 columns, which only ever come from plain
+# YYYY-MM-DD text, are turned back into that text
+_NO_TIMESTAMPS = "\x00"
+
+
+def _like_c_engine(df):
+    for i in range(df.shape[1]):
+        col = df.iloc[:, i]
+        if col.dtype == object:
+            present = col.dropna()
+            if len(present) and all(type(v) is datetime.date for v in present):
+                col = col.map(datetime.date.isoformat, na_action="ignore").infer_objects()
+            elif len(present) < len(col):
+                col = col.where(col.notna(), np.nan)  # None → NaN, as the C engine fills gaps
+            df.isetitem(i, col)
+    return df
+
+
+SNIFF_BYTES = 64 * 1024
+
+
+def delimiter(path):
+    """Field separator of a delimited file: tab for .tsv, comma for .csv, sniffed for .txt."""
+    ext = file_ext(path)
+    if ext != ".txt":
+        return "\t" if ext == ".tsv" else ","
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        sample = f.read(SNIFF_BYTES)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","  # a single column, or nothing to go on
+
+
+def _read_delimited(path, sheet_name=None, header=0, nrows=None, usecols=None, book=None):
+    # sniffed once, so the nrows probe and the full read split rows the same way
+    sep = delimiter(path)
+    if HAVE_ARROW and nrows is None:
+        # pyarrow's parser is multithreaded but needs explicit, existing usecols
+        if usecols is not None:
+            present = pd.read_csv(path, sep=sep, header=header, nrows=0).columns
+            usecols = [c for c in present if c in set(usecols)]
+        return _like_c_engine(pd.read_csv(path, sep=sep, header=header, usecols=usecols,
+                                          engine="pyarrow", date_format=_NO_TIMESTAMPS))
+    return pd.read_csv(path, sep=sep, header=header, nrows=nrows,
+                       usecols=_usecols_filter(usecols), engine="c")
+
+
+def _read_parquet(path, sheet_name=None, header=0, nrows=None, usecols=None, book=None):
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path, memory_map=True)
+    columns = None
+    if usecols is not None:
+        columns = [c for c in pf.schema_arrow.names if c in set(usecols)]
+    if nrows is None:
+        table = pf.read(columns=columns, use_threads=True)
+    else:
+        # only decode as many row groups as the sample needs
+        groups, rows = [], 0
+        for i in range(pf.num_row_groups):
+            if rows >= nrows:
+                break
+            groups.append(i)
+            rows += pf.metadata.row_group(i).num_rows
+        table = pf.read_row_groups(groups, columns=columns, use_threads=True).slice(0, nrows)
+    return table.to_pandas()
+
+
+def _read_feather(path, sheet_name=None, header=0, nrows=None, usecols=None, book=None):
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+
+    columns = None
+    if usecols is not None:
+        # the schema is in the file footer; no column data is read
+        with ipc.open_file(path) as reader:
+            names = reader.schema.names
+        columns = [c for c in names if c in set(usecols)]
+    table = feather.read_table(path, columns=columns, memory_map=True, use_threads=True)
+    if nrows is not None:
+        table = table.slice(0, nrows)
+    return table.to_pandas()
+
+
+register_backend(ReaderBackend(
+    "csv", TEXT_FORMATS, _read_delimited, streaming=True,
+))
+register_backend(ReaderBackend(
+    "parquet", (".parquet", ".pq"), _read_parquet, available=HAVE_ARROW,
+))
+register_backend(ReaderBackend(
+    "feather", (".feather", ".arrow"), _read_feather, available=HAVE_ARROW,
+))
+
+
+def is_workbook(path) -> bool:
+    """True for spreadsheet formats that contain sheets."""
+    return file_ext(path) not in TEXT_FORMATS + COLUMNAR_FORMATS
+
+
+# ---------------------------------------------------------------------- #
+# Selection                                                              #
+# ---------------------------------------------------------------------- #
+def select_backend(path, nrows=False, usecols=False) -> ReaderBackend:
+    """Pick the calibrated backend for *path*'s type, else the first capable one."""
+    ext = file_ext(path)
+    preferred = get_setting(SETTINGS_KEY, {}).get(ext)
+    if preferred in _BACKENDS and _BACKENDS[preferred].can(ext, nrows, usecols):
+        return _BACKENDS[preferred]
+    for backend in _BACKENDS.values():
+        if backend.can(ext, nrows, usecols):
+            return backend
+    raise ValueError(f"No installed reader supports '{ext}' files.")
+
+
+def read_sheet(path, sheet_name, header=0, nrows=None, usecols=None, book=None, backend=None):
+    """Read one sheet through *backend* (auto-selected when omitted)."""
+    if backend is None:
+        backend = select_backend(path, nrows is not None, usecols is not None)
+    return backend.read(path, sheet_name, header=header, nrows=nrows, usecols=usecols, book=book)
+
+
+def sample_frame(rows):
+    """Mixed-type frame used to generate benchmark workbooks."""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "price": rng.random(rows) * 100,
+        "qty": rng.integers(0, 50, rows),
+        "region": rng.choice(["north", "south", "east", "west"], rows),
+        "label": [f"item-{i}" for i in range(rows)],
+        "when": pd.Timestamp("2024-01-01") + pd.to_timedelta(np.arange(rows), unit="min"),
+    })
+
+
+def calibrate(rows=5000, repeats=2, save=True) -> dict:
+    """Time every available backend on a generated workbook.
+
+    Returns ``{ext: {backend name: seconds}}`` and, when *save* is set, stores
+    the fastest backend per file type in ``app_settings.json``.  Only ``.xlsx``
+    can be generated locally; other types keep the registry order.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        sample = os.path.join(tmp, "calibration.xlsx")
+        sample_frame(rows).to_excel(sample, index=False)
+        timings = {}
+        for backend in available_backends(".xlsx"):
+            try:
+                best = float("inf")
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    backend.read(sample, 0)
+                    best = min(best, time.perf_counter() - start)
+                timings[backend.name] = best
+            except Exception:
+                continue  # a backend that can't read the sample is never chosen
+        if timings:
+            # .xlsm is the same container format, so it shares the measurement
+            results[".xlsx"] = timings
+            results[".xlsm"] = {n: t for n, t in timings.items() if ".xlsm" in get_backend(n).formats}
+    if save and results:
+        choice = get_setting(SETTINGS_KEY, {})
+        choice.update({ext: min(t, key=t.get) for ext, t in results.items()})
+        set_setting(SETTINGS_KEY, choice)
+    return results
+
+
+def is_calibrated() -> bool:
+    return ".xlsx" in get_setting(SETTINGS_KEY, {})
@@ -0,0 +1,238 @@
+# core/workbook_cache.py
+"""Session cache of parsed sheet grids so sheet / header changes skip re-parsing."""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+from gui.core.loader import (
+    load_raw_grid, frame_from_grid, probe_excel_sheet, load_excel_sheet, PROBE_ROWS,
+    read_sheet_timed, sheet_pool, discard_sheet_pool, open_workbook, list_sheets,
+)
+from gui.core.readers import is_workbook, COLUMNAR_FORMATS, file_ext
+
+DEFAULT_BUDGET_MB = 512
+
+
+def file_signature(path: str) -> tuple:
+    """Return (abs path, mtime, size) – changes whenever the file is rewritten."""
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+
+class WorkbookCache:
+    """LRU cache of raw sheet grids keyed by (path, mtime, size, sheet).
+
+    Grids are stored without a header applied, so a header-row change is a
+    cheap re-slice of the cached grid rather than a new parse.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_BUDGET_MB * 1024 ** 2, disk_cache=None):
+        self.max_bytes = max_bytes
+        self.disk_cache = disk_cache  # optional SheetDiskCache consulted on a miss
+        self._grids: OrderedDict[tuple, tuple[pd.DataFrame, int]] = OrderedDict()
+        self._books: dict[tuple, list[pd.ExcelFile]] = {}  # idle handles per file version
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._inflight = {}  # key -> Future of a prefetch still parsing that sheet
+        self._stop_prefetch = threading.Event()
+
+    # ------------------------------------------------------------------ #
+    # Workbook handles                                                   #
+    # ------------------------------------------------------------------ #
+    @contextmanager
+    def _book(self, path: str):
+        """An open ``pd.ExcelFile`` for *path* that no other task uses meanwhile.
+
+        Background tasks overlap (a cancelled load keeps running while a new
+        probe starts), so each one borrows its own handle; idle handles are
+        kept for the next task.
+        """
+        sig = file_signature(path)
+        with self._lock:
+            # drop handles for older versions of the same file
+            for old in [s for s in self._books if s[0] == sig[0] and s != sig]:
+                for stale in self._books.pop(old):
+                    stale.close()
+            idle = self._books.setdefault(sig, [])
+            book = idle.pop() if idle else None
+        if book is None:
+            book = open_workbook(path)
+        try:
+            yield book
+        finally:
+            with self._lock:
+                if sig in self._books:
+                    self._books[sig].append(book)
+                else:
+                    book.close()  # cleared or superseded while in use
+
+    def _book_for(self, path: str):
+        return self._book(path) if is_workbook(path) else nullcontext()
+
+    def sheet_names(self, path: str) -> list:
+        with self._book_for(path) as book:
+            return list_sheets(path, book)
+
+    def disk_cache_for(self, path: str):
+        # Parquet / Feather are already columnar, a sidecar copy gains nothing
+        return None if file_ext(path) in COLUMNAR_FORMATS else self.disk_cache
+
+    # ------------------------------------------------------------------ #
+    # Grid cache                                                         #
+    # ------------------------------------------------------------------ #
+    def grid(self, path: str, sheet_name) -> pd.DataFrame:
+        """Return the raw grid for *sheet_name*, parsing it only on a miss."""
+        key = file_signature(path) + (sheet_name,)
+        with self._lock:
+            if key in self._grids:
+                self._grids.move_to_end(key)
+                return self._grids[key][0]
+            pending = self._inflight.get(key)
+        if pending is not None:
+            # a prefetch worker is already parsing this sheet – wait for it
+            try:
+                grid, _ = pending.result()
+                self.put(key, grid)
+                return grid
+            except Exception:
+                pass
+        with self._book(path) as book:
+            grid = load_raw_grid(path, sheet_name, book=book)
+        self.put(key, grid)
+        return grid
+
+    def put(self, key: tuple, grid: pd.DataFrame, prefetched: bool = False) -> bool:
+        """Cache *grid*; returns False if it did not fit.
+
+        A *prefetched* grid goes in as the least recently used, so it is
+        evicted before (never instead of) a sheet the user has opened.
+        """
+        size = int(grid.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            if key in self._grids:
+                self._bytes -= self._grids.pop(key)[1]
+            self._grids[key] = (grid, size)
+            if prefetched:
+                self._grids.move_to_end(key, last=False)
+            self._bytes += size
+            self._evict()
+            return key in self._grids
+
+    def _evict(self) -> None:
+        # always keep the most recent grid, even if it alone exceeds the budget
+        while self._bytes > self.max_bytes and len(self._grids) > 1:
+            _, (_, size) = self._grids.popitem(last=False)
+            self._bytes -= size
+
+    def prefetch(self, path: str, sheet_names, max_workers=None) -> dict:
+        """Parse the uncached *sheet_names* in a process pool and cache their grids.
+
+        Returns per-sheet parse times in seconds.  ``stop_prefetch()`` cancels
+        sheets that have not started yet, and so does a full cache: prefetched
+        grids only use budget the opened sheets leave free.
+        """
+        if not is_workbook(path):
+            return {}
+        sig = file_signature(path)
+        with self._lock:
+            todo = [s for s in sheet_names
+                    if sig + (s,) not in self._grids and sig + (s,) not in self._inflight]
+        timings = {}
+        if not todo:
+            return timings
+        self._stop_prefetch.clear()
+        pool = sheet_pool(max_workers)
+        futures = {}
+        with self._lock:
+            for name in todo:
+                future = pool.submit(read_sheet_timed, path, name, None)
+                futures[future] = sig + (name,)
+                self._inflight[sig + (name,)] = future
+        try:
+            for future in as_completed(futures):
+                key = futures[future]
+                with self._lock:
+                    self._inflight.pop(key, None)
+                if self._stop_prefetch.is_set():
+                    break
+                if isinstance(future.exception(), BrokenProcessPool):
+                    discard_sheet_pool(pool)
+                    break
+                if future.exception() is None:
+                    grid, seconds = future.result()
+                    if not self.put(key, grid, prefetched=True):
+                        break  # no room left; the remaining sheets would not be kept either
+                    timings[key[-1]] = seconds
+        finally:
+            # the pool outlives this call: drop whatever has not started
+            for future in futures:
+                future.cancel()
+            with self._lock:
+                for key in futures.values():
+                    self._inflight.pop(key, None)
+        return timings
+
+    def stop_prefetch(self) -> None:
+        self._stop_prefetch.set()
+
+    def load_sheet(self, path: str, sheet_name, header_row: int) -> pd.DataFrame:
+        """Return *sheet_name* as a DataFrame with *header_row* applied."""
+        if not is_workbook(path):
+            # text / columnar readers apply the header themselves; no grid to re-slice
+            return load_excel_sheet(path, sheet_name, header_row, cache=self.disk_cache_for(path))
+        key = file_signature(path) + (sheet_name,)
+        if self.disk_cache is not None and key not in self._grids:
+            return self.disk_cache.load(
+                path, sheet_name, header_row,
+                lambda: frame_from_grid(self.grid(path, sheet_name), header_row),
+            )
+        return frame_from_grid(self.grid(path, sheet_name), header_row)
+
+    def load_columns(self, path: str, sheet_name, header_row: int, columns) -> pd.DataFrame:
+        """Return only *columns* of a sheet, re-reading the file with ``usecols``.
+
+        A grid already held in memory is sliced instead of re-read.
+        """
+        key = file_signature(path) + (sheet_name,)
+        if is_workbook(path) and key in self._grids:
+            df = frame_from_grid(self.grid(path, sheet_name), header_row)
+            return df[[c for c in df.columns if c in set(columns)]]
+        return load_excel_sheet(path, sheet_name, header_row,
+                                cache=self.disk_cache_for(path), usecols=list(columns))
+
+    def is_cached(self, path: str, sheet_name, header_row: int) -> bool:
+        """True if *load_sheet* would be served without parsing the workbook."""
+        if file_signature(path) + (sheet_name,) in self._grids:
+            return True
+        disk_cache = self.disk_cache_for(path)
+        return disk_cache is not None and disk_cache.contains(path, sheet_name, header_row)
+
+    def probe_sheet(self, path: str, sheet_name, header_row: int, nrows: int = PROBE_ROWS):
+        """Return ``(df, complete)`` – the full sheet if cached, else a sample.
+
+        ``complete`` is False when *df* only holds the first *nrows* rows.
+        """
+        if self.is_cached(path, sheet_name, header_row):
+            return self.load_sheet(path, sheet_name, header_row), True
+        with self._book_for(path) as book:
+            return probe_excel_sheet(path, sheet_name, header_row, nrows, book=book), False
+
+    def clear(self) -> None:
+        self.stop_prefetch()
+        with self._lock:
+            self._grids.clear()
+            self._bytes = 0
+            for idle in self._books.values():
+                for book in idle:
+                    book.close()
+            self._books.clear()
+
+    @property
+    def bytes_used(self) -> int:
+        return self._bytes
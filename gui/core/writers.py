@@ -0,0 +1,562 @@
+# core/writers.py
+"""Registry of export writer backends that stream a frame to disk in row chunks."""
+
+import importlib.util
+import json
+import os
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from gui.core.config_manager import get_setting
+
+SETTINGS_KEY = "writer_backends"
+CHUNK_ROWS = 50_000  # rows converted per step; progress is reported after each one
+SHEET_NAME = "Sheet1"
+EXCEL_MAX_ROWS = 1_048_576  # rows per worksheet, header included
+EXCEL_MAX_COLS = 16_384
+SHARD_MODE_KEY = "excel_shard_mode"  # "sheets" (one workbook) or "files" (numbered workbooks)
+
+
+class WriterBackend:
+    """One way of writing a frame to a file.
+
+    ``write(frame, path, progress)`` writes the header and every row, calls
+    ``progress(rows_done, total_rows)`` as it goes and must not hold more
+    than a chunk of converted rows in memory at a time. Formats with a
+    size limit set ``max_rows`` / ``max_cols``; ``write_sheets(sheets,
+    path, progress)``, if given, writes several (name, frame) sheets to
+    one file, which is how oversized output is split within a workbook.
+    """
+
+    def __init__(self, name, formats, write, available=True, streaming=True, label=None,
+                 max_rows=None, max_cols=None, write_sheets=None):
+        self.name = name
+        self.formats = tuple(formats)
+        self.write = write
+        self.available = available
+        self.streaming = streaming
+        self.label = label or name  # file-type name for save dialogs
+        self.max_rows = max_rows  # data rows per file / sheet
+        self.max_cols = max_cols
+        self.write_sheets = write_sheets
+
+    def can(self, ext) -> bool:
+        return self.available and ext in self.formats
+
+    def __repr__(self):
+        return f"WriterBackend({self.name!r})"
+
+
+_BACKENDS: dict[str, WriterBackend] = {}
+
+
+def register_backend(backend: WriterBackend) -> WriterBackend:
+    """Add (or replace) a backend; registry order is the preference order."""
+    _BACKENDS[backend.name] = backend
+    return backend
+
+
+def available_backends(ext=None) -> list[WriterBackend]:
+    return [b for b in _BACKENDS.values() if b.available and (ext is None or ext in b.formats)]
+
+
+def get_backend(name) -> WriterBackend:
+    return _BACKENDS[name]
+
+
+# ---------------------------------------------------------------------- #
+# Shared helpers                                                         #
+# ---------------------------------------------------------------------- #
+def file_ext(path) -> str:
+    return os.path.splitext(str(path))[1].lower()
+
+
+def _installed(module) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def chunk_starts(n_rows, chunk_rows=CHUNK_ROWS):
+    return range(0, n_rows, chunk_rows)
+
+
+def cell_values(series):
+    """Column values as plain Python objects the way ``to_excel`` writes them.
+
+    Missing values become None (an empty cell) and infinities the strings
+    "inf" / "-inf", matching ``DataFrame.to_excel``'s defaults.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in "iub":
+        return series.tolist()
+    if isinstance(dtype, np.dtype) and dtype.kind == "f":
+        arr = series.to_numpy()
+        values = arr.astype(object)
+        values[np.isnan(arr)] = None
+        values[np.isposinf(arr)] = "inf"
+        values[np.isneginf(arr)] = "-inf"
+        return values.tolist()
+    values = series.astype(object).to_numpy(copy=True)
+    values[series.isna().to_numpy()] = None
+    return values.tolist()
+
+
+def chunk_rows(frame, start, stop):
+    """Rows start:stop of frame as tuples of cell values."""
+    chunk = frame.iloc[start:stop]
+    return zip(*(cell_values(chunk.iloc[:, i]) for i in range(chunk.shape[1])))
+
+
+def converted_chunks(frame, convert):
+    """Yield (rows done, convert(chunk)) for each chunk of frame.
+
+    The next chunk is converted on a thread while the caller writes the
+    current one (pandas → Arrow conversion and Arrow writers release the GIL).
+    """
+    n_rows = len(frame)
+    starts = list(chunk_starts(n_rows))
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="export") as pool:
+        ahead = pool.submit(convert, frame.iloc[:CHUNK_ROWS]) if starts else None
+        for start in starts:
+            stop = min(start + CHUNK_ROWS, n_rows)
+            current = ahead.result()
+            if stop < n_rows:
+                ahead = pool.submit(convert, frame.iloc[stop:stop + CHUNK_ROWS])
+            yield stop, current
+
+
+# ---------------------------------------------------------------------- #
+# Built-in backends                                                      #
+# ---------------------------------------------------------------------- #
+HAVE_XLSXWRITER = _installed("xlsxwriter")
+
+
+def _sheets_progress(sheets, progress):
+    # progress(done, total) over all sheets from per-sheet (done, sheet total) calls
+    if progress is None:
+        return [None] * len(sheets)
+    total = sum(len(frame) for _, frame in sheets)
+    offsets = np.cumsum([0] + [len(frame) for _, frame in sheets[:-1]])
+    return [lambda done, _n, offset=int(offset): progress(offset + done, total) for offset in offsets]
+
+
+def _single_sheet(write_sheets):
+    def write(frame, path, progress=None, sheet_name=SHEET_NAME):
+        write_sheets([(sheet_name, frame)], path, progress)
+    return write
+
+
+def _write_xlsxwriter(sheets, path, progress=None):
+    # constant_memory flushes each row to disk as soon as the next one starts
+    import xlsxwriter
+
+    wb = xlsxwriter.Workbook(path, {
+        "constant_memory": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+        "remove_timezone": True,
+    })
+    try:
+        header = wb.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+        for (sheet_name, frame), report in zip(sheets, _sheets_progress(sheets, progress)):
+            n_rows = len(frame)
+            ws = wb.add_worksheet(sheet_name)
+            ws.write_row(0, 0, [str(c) for c in frame.columns], header)
+            for start in chunk_starts(n_rows):
+                stop = min(start + CHUNK_ROWS, n_rows)
+                for r, row in enumerate(chunk_rows(frame, start, stop), start + 1):
+                    ws.write_row(r, 0, row)
+                if report:
+                    report(stop, n_rows)
+    finally:
+        wb.close()
+
+
+def _write_openpyxl(sheets, path, progress=None):
+    # write-only workbooks stream rows to a temporary file instead of
+    # keeping a cell object per value
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    wb = Workbook(write_only=True)
+    thin = Side(style="thin")
+    for (sheet_name, frame), report in zip(sheets, _sheets_progress(sheets, progress)):
+        n_rows = len(frame)
+        ws = wb.create_sheet(sheet_name)
+        header = []
+        for col in frame.columns:
+            # same look as the header row to_excel writes
+            cell = WriteOnlyCell(ws, value=col)
+            cell.font = Font(bold=True)
+            cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+            cell.alignment = Alignment(horizontal="center", vertical="top")
+            header.append(cell)
+        ws.append(header)
+        for start in chunk_starts(n_rows):
+            stop = min(start + CHUNK_ROWS, n_rows)
+            for row in chunk_rows(frame, start, stop):
+                ws.append(row)
+            if report:
+                report(stop, n_rows)
+    wb.save(path)
+
+
+def _write_parallel_xlsx(sheets, path, progress=None):
+    # sheet XML rendered and deflated in row ranges on a process pool,
+    # the ranges of every sheet sharing the one pool
+    from gui.core.parallel_xlsx import write_workbook
+
+    write_workbook(sheets, path, progress)
+
+
+DELIMITERS = {".csv": ",", ".tsv": "\t"}
+HAVE_ARROW = _installed("pyarrow")
+
+
+def arrow_frame(frame):
+    """(frame, schema) ready for Arrow writers.
+
+    Categoricals become plain columns (Arrow IPC files cannot change a
+    dictionary between batches) and object columns Arrow cannot type,
+    such as mixed numbers and text, are written as text.
+    """
+    import pyarrow as pa
+
+    frame = frame.copy(deep=False)
+    for i in range(frame.shape[1]):
+        col = frame.iloc[:, i]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            frame.isetitem(i, col.astype(col.cat.categories.dtype))
+        elif col.dtype == object:
+            try:
+                pa.Schema.from_pandas(frame.iloc[:, [i]], preserve_index=False)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                frame.isetitem(i, col.astype(str).where(col.notna(), None))
+    return frame, pa.Schema.from_pandas(frame, preserve_index=False)
+
+
+def _arrow_converter(schema):
+    import pyarrow as pa
+
+    def convert(chunk):
+        try:
+            return pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # a value of another type further down a column typed from its first rows
+            chunk = chunk.copy(deep=False)
+            for i, field in enumerate(schema):
+                col = chunk.iloc[:, i]
+                text = pa.types.is_string(field.type) or pa.types.is_large_string(field.type)
+                if col.dtype == object and text:
+                    chunk.isetitem(i, col.astype(str).where(col.notna(), None))
+            return pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+    return convert
+
+
+def _write_arrow(open_writer):
+    # shared loop for the Arrow-based writers: open_writer(path, schema) -> writer
+    def write(frame, path, progress=None):
+        frame, schema = arrow_frame(frame)
+        with open_writer(path, schema) as writer:
+            for done, table in converted_chunks(frame, _arrow_converter(schema)):
+                writer.write_table(table)
+                if progress:
+                    progress(done, len(frame))
+    return write
+
+
+def _open_parquet(path, schema):
+    import pyarrow.parquet as pq
+    return pq.ParquetWriter(path, schema, compression="snappy")
+
+
+def _open_feather(path, schema):
+    import pyarrow as pa
+    compression = "lz4" if pa.Codec.is_available("lz4") else None
+    return pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(compression=compression))
+
+
+def _open_delimited(path, schema):
+    import pyarrow.csv as pacsv
+    options = pacsv.WriteOptions(delimiter=DELIMITERS.get(file_ext(path), ","), quoting_style="needed")
+    return pacsv.CSVWriter(path, schema, write_options=options)
+
+
+def _write_delimited_pandas(frame, path, progress=None):
+    sep = DELIMITERS.get(file_ext(path), ",")
+    with open(path, "w", encoding="utf-8", newline="") as fp:
+        fp.write(frame.iloc[:0].to_csv(sep=sep, index=False))
+        for done, text in converted_chunks(
+            frame, lambda chunk: chunk.to_csv(sep=sep, index=False, header=False)
+        ):
+            fp.write(text)
+            if progress:
+                progress(done, len(frame))
+
+
+def _write_jsonl(frame, path, progress=None):
+    with open(path, "w", encoding="utf-8") as fp:
+        for done, text in converted_chunks(
+            frame, lambda chunk: chunk.to_json(orient="records", lines=True, date_format="iso")
+        ):
+            fp.write(text)
+            if progress:
+                progress(done, len(frame))
+
+
+EXCEL_LIMITS = {"max_rows": EXCEL_MAX_ROWS - 1, "max_cols": EXCEL_MAX_COLS}  # less the header row
+
+register_backend(WriterBackend(
+    "parallel-xlsx", (".xlsx",), _single_sheet(_write_parallel_xlsx), label="Excel files",
+    write_sheets=_write_parallel_xlsx, **EXCEL_LIMITS,
+))
+register_backend(WriterBackend(
+    "xlsxwriter", (".xlsx",), _single_sheet(_write_xlsxwriter), available=HAVE_XLSXWRITER,
+    label="Excel files", write_sheets=_write_xlsxwriter, **EXCEL_LIMITS,
+))
+register_backend(WriterBackend(
+    "openpyxl-write-only", (".xlsx", ".xlsm"), _single_sheet(_write_openpyxl), label="Excel files",
+    write_sheets=_write_openpyxl, **EXCEL_LIMITS,
+))
+# pandas first: its text is what exports have always contained, with or
+# without pyarrow; arrow-csv renders timestamps and booleans its own way
+register_backend(WriterBackend(
+    "pandas-csv", tuple(DELIMITERS), _write_delimited_pandas, label="CSV / TSV",
+))
+register_backend(WriterBackend(
+    "arrow-csv", tuple(DELIMITERS), _write_arrow(_open_delimited), available=HAVE_ARROW, label="CSV / TSV",
+))
+register_backend(WriterBackend(
+    "parquet", (".parquet", ".pq"), _write_arrow(_open_parquet), available=HAVE_ARROW, label="Parquet",
+))
+register_backend(WriterBackend(
+    "feather", (".feather", ".arrow"), _write_arrow(_open_feather), available=HAVE_ARROW, label="Feather",
+))
+register_backend(WriterBackend(
+    "jsonl", (".jsonl", ".ndjson"), _write_jsonl, label="JSON Lines",
+))
+
+
+# ---------------------------------------------------------------------- #
+# Selection                                                              #
+# ---------------------------------------------------------------------- #
+def select_backend(path) -> WriterBackend:
+    """The backend chosen in settings for *path*'s type, else the first installed one."""
+    ext = file_ext(path)
+    preferred = get_setting(SETTINGS_KEY, {}).get(ext)
+    if preferred in _BACKENDS and _BACKENDS[preferred].can(ext):
+        return _BACKENDS[preferred]
+    for backend in _BACKENDS.values():
+        if backend.can(ext):
+            return backend
+    raise ValueError(f"No installed writer supports '{ext}' files.")
+
+
+def write_frame(frame, path, progress=None, backend=None) -> dict:
+    """Write *frame* to *path* through *backend* (auto-selected when omitted).
+
+    Output with more rows than the format holds is split into shards (see
+    ``write_shards``) before anything is written. Returns ``{"path",
+    "backend", "rows", "seconds", "rows_per_s", "files"}``, plus
+    ``"shards"`` and ``"manifest"`` when the output was split.
+    """
+    if backend is None:
+        backend = select_backend(path)
+    if backend.max_cols and frame.shape[1] > backend.max_cols:
+        raise ValueError(
+            f"{frame.shape[1]:,} columns do not fit in a '{file_ext(path)}' file "
+            f"(at most {backend.max_cols:,})."
+        )
+    start = time.perf_counter()
+    if backend.max_rows and len(frame) > backend.max_rows:
+        extra = write_shards(frame, path, progress, backend)
+    else:
+        backend.write(frame, path, progress)
+        extra = {"files": [path]}
+    seconds = time.perf_counter() - start
+    return {
+        "path": path,
+        "backend": backend.name,
+        "rows": len(frame),
+        "seconds": seconds,
+        "rows_per_s": len(frame) / seconds if seconds > 0 else float("inf"),
+        **extra,
+    }
+
+
+def shard_bounds(n_rows, max_rows):
+    """(start, stop) row ranges of at most *max_rows* rows covering n_rows."""
+    return [(start, min(start + max_rows, n_rows)) for start in range(0, n_rows, max_rows)]
+
+
+def shard_path(path, number):
+    """report.xlsx → report_part002.xlsx for shard 2."""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_part{number:03d}{ext}"
+
+
+def manifest_path(path):
+    return os.path.splitext(path)[0] + ".manifest.json"
+
+
+def write_shards(frame, path, progress=None, backend=None) -> dict:
+    """Split *frame* into shards of at most ``backend.max_rows`` rows and write them.
+
+    The ``excel_shard_mode`` setting picks numbered sheets in one workbook
+    ("sheets", the default, when the backend can write several sheets) or
+    numbered files next to *path* ("files"), which are written concurrently
+    (the parallel XLSX writer renders all of them on its one shared pool).
+    A ``<name>.manifest.json`` beside the output records the file, sheet and
+    1-based data rows of each shard. Returns ``{"files", "shards", "manifest"}``.
+    """
+    if backend is None:
+        backend = select_backend(path)
+    bounds = shard_bounds(len(frame), backend.max_rows)
+    by_sheet = get_setting(SHARD_MODE_KEY, "sheets") != "files" and backend.write_sheets is not None
+    shards = []
+    for number, (start, stop) in enumerate(bounds, 1):
+        shards.append({
+            "file": os.path.basename(path if by_sheet else shard_path(path, number)),
+            "sheet": f"Sheet{number}" if by_sheet else SHEET_NAME,
+            "first_row": start + 1,
+            "last_row": stop,
+            "rows": stop - start,
+        })
+
+    if by_sheet:
+        sheets = [(shard["sheet"], frame.iloc[start:stop]) for shard, (start, stop) in zip(shards, bounds)]
+        backend.write_sheets(sheets, path, progress)
+        files = [path]
+    else:
+        files = [shard_path(path, number) for number in range(1, len(bounds) + 1)]
+        run_concurrently(
+            [(lambda report, f=file, start=start, stop=stop: backend.write(frame.iloc[start:stop], f, report),
+              stop - start) for file, (start, stop) in zip(files, bounds)],
+            progress,
+        )
+
+    manifest = manifest_path(path)
+    with open(manifest, "w", encoding="utf-8") as fp:
+        json.dump({
+            "rows": len(frame),
+            "columns": [str(c) for c in frame.columns],
+            "max_rows_per_shard": backend.max_rows,
+            "mode": "sheets" if by_sheet else "files",
+            "shards": shards,
+        }, fp, indent=2)
+    return {"files": files, "shards": shards, "manifest": manifest}
+
+
+def run_concurrently(jobs, progress=None) -> list:
+    """Run each (job, rows) on its own thread; job(report) writes rows and reports them.
+
+    *progress(done, total)* sums the rows reported over all jobs and is
+    only ever called from the calling thread. The first failure is raised
+    once the others have finished. Returns each job's result, in order.
+    """
+    done = [0] * len(jobs)
+    total = sum(rows for _, rows in jobs)
+
+    def track(i):
+        def report(rows, _total):
+            done[i] = rows
+        return report
+
+    with ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="export") as pool:
+        futures = [pool.submit(job, track(i)) for i, (job, _) in enumerate(jobs)]
+        pending = set(futures)
+        while pending:
+            finished, pending = wait(pending, timeout=0.2, return_when=FIRST_EXCEPTION)
+            if any(f.exception() for f in finished):
+                break
+            if progress:
+                progress(sum(done), total)
+        return [f.result() for f in futures]
+
+
+def write_targets(frame, paths, progress=None) -> list:
+    """Write the same *frame* to every path in *paths*, each through its own backend.
+
+    Targets are written concurrently (see ``run_concurrently``). Returns
+    ``write_frame``'s stats for each path.
+    """
+    backends = [select_backend(path) for path in paths]  # fail before writing anything
+    if len(paths) == 1:
+        return [write_frame(frame, paths[0], progress, backends[0])]
+    return run_concurrently(
+        [(lambda report, path=path, backend=backend: write_frame(frame, path, report, backend), len(frame))
+         for path, backend in zip(paths, backends)],
+        progress,
+    )
+
+
+def target_paths(path, extra_formats):
+    """*path* plus a sibling file for each extension in *extra_formats* ("csv, parquet")."""
+    stem = os.path.splitext(path)[0]
+    paths = [path]
+    for ext in extra_formats.replace(";", ",").split(","):
+        ext = ext.strip().lower()
+        if ext:
+            sibling = f"{stem}.{ext.lstrip('.')}"
+            if sibling not in paths:
+                paths.append(sibling)
+    return paths
+
+
+def save_filetypes():
+    """File types for a save dialog, one entry per label, Excel first."""
+    labels = {}
+    for backend in available_backends():
+        labels.setdefault(backend.label, [])
+        labels[backend.label] += [f"*{ext}" for ext in backend.formats if f"*{ext}" not in labels[backend.label]]
+    return [(label, " ".join(patterns)) for label, patterns in labels.items()] + [("All files", "*.*")]
+
+
+def describe_write(stats) -> str:
+    text = (f"Wrote {stats['rows']:,} rows to {os.path.basename(stats['path'])} in {stats['seconds']:.1f}s "
+            f"({stats['rows_per_s']:,.0f} rows/s, {stats['backend']})")
+    if stats.get("shards"):
+        parts = "files" if len(stats["files"]) > 1 else "sheets"
+        text += (f", split into {len(stats['shards'])} {parts} of at most "
+                 f"{max(shard['rows'] for shard in stats['shards']):,} rows; "
+                 f"row ranges in {os.path.basename(stats['manifest'])}")
+    return text
+
+
+# ---------------------------------------------------------------------- #
+# Benchmark                                                              #
+# ---------------------------------------------------------------------- #
+def benchmark(rows=50_000, backends=None):
+    """Time each available .xlsx writer against ``DataFrame.to_excel``.
+
+    Every output is read back and checked against what ``to_excel``
+    produced. Returns ``{name: seconds}``.
+    """
+    import tempfile
+
+    from gui.core.readers import sample_frame
+
+    frame = sample_frame(rows)
+    frame.loc[frame.index[::7], "price"] = np.nan
+    frame.loc[frame.index[::11], "region"] = None
+    with tempfile.TemporaryDirectory() as tmp:
+        reference = os.path.join(tmp, "to_excel.xlsx")
+        start = time.perf_counter()
+        frame.to_excel(reference, index=False)
+        timings = {"to_excel": time.perf_counter() - start}
+        expected = pd.read_excel(reference)
+        for backend in backends or available_backends(".xlsx"):
+            path = os.path.join(tmp, f"{backend.name}.xlsx")
+            timings[backend.name] = write_frame(frame, path, backend=backend)["seconds"]
+            pd.testing.assert_frame_equal(pd.read_excel(path), expected)
+    return timings
+
+
+if __name__ == "__main__":
+    import sys
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    result = benchmark(n)
+    for label, seconds in result.items():
+        print(f"{label:>20}: {seconds:.3f}s  ({n / seconds:,.0f} rows/s)")
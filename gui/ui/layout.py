@@ -138,14 +138,14 @@ def create_main_file_section(app):
     
     load_button = ttk.Button(
         row1,
-        text="Load Excel File",
+        text="Load Data File",
         command=app.load_main_file
     )
     load_button.pack(side="left", padx=(0, PAD_X))
     
     # Apply tooltip if available
     if USE_ENHANCED_UI:
-        app.theme.create_tooltip(load_button, "Load a main Excel file to process")
+        app.theme.create_tooltip(load_button, "Load a main Excel, CSV, Parquet or Feather file to process")
     
     ttk.Label(row1, text="Header Row:").pack(side="left", padx=FIELD_PAD)
     header_entry = ttk.Entry(
@@ -154,6 +154,8 @@ def create_main_file_section(app):
         width=5
     )
     header_entry.pack(side="left", padx=FIELD_PAD)
+    # re-slice the cached sheet when the header row changes
+    header_entry.bind("<Return>", app.load_sheet)
     
     ttk.Label(row1, text="Sheet:").pack(side="left", padx=PAD_X)
     
@@ -162,6 +164,44 @@ def create_main_file_section(app):
     app.sheet_dropdown.pack(side="left", padx=FIELD_PAD)
     app.sheet_dropdown.bind("<<ComboboxSelected>>", app.load_sheet)
     
+    # Cancel an in-progress load (main or reference file)
+    cancel_button = ttk.Button(
+        row1,
+        text="Cancel Load",
+        command=app.cancel_load
+    )
+    cancel_button.pack(side="left", padx=PAD_X)
+    
+    # Purge the persistent sheet cache
+    clear_cache_button = ttk.Button(
+        row1,
+        text="Clear Cache",
+        command=app.purge_cache
+    )
+    clear_cache_button.pack(side="right")
+    
+    # Shrink dtypes after the full load (applies to the next load)
+    compact_check = ttk.Checkbutton(
+        row1,
+        text="Compact memory",
+        variable=app.compact_dtypes
+    )
+    compact_check.pack(side="right", padx=PAD_X)
+    
+    # Keep only the probe rows in memory; exports read just the columns they use
+    defer_check = ttk.Checkbutton(
+        row1,
+        text="Load columns at export",
+        variable=app.defer_full_load
+    )
+    defer_check.pack(side="right", padx=PAD_X)
+    
+    if USE_ENHANCED_UI:
+        app.theme.create_tooltip(defer_check, "Skip loading every row up front; an export reads only the columns it needs")
+        app.theme.create_tooltip(cancel_button, "Stop waiting for the file that is currently loading")
+        app.theme.create_tooltip(clear_cache_button, "Delete cached copies of previously loaded sheets")
+        app.theme.create_tooltip(compact_check, "Store loaded data with smaller numeric, categorical and Arrow string types")
+    
     # Display current file info if available
     if hasattr(app, 'file_path') and app.file_path:
         file_info = ttk.Label(
@@ -345,7 +385,8 @@ def create_column_controls_section(app):
             )
             
         entry.grid(row=0, column=1, padx=4, sticky="ew")
-        entry.bind("<KeyRelease>", lambda e, c=col: app.update_formula_preview(c))
+        # trace the variable: FormulaEntry is a frame, so key bindings on it never fire
+        formula_var.trace_add("write", lambda *_, c=col: app.update_formula_preview(c))
         app.formula_vars[col] = formula_var
         
         # Configure the grid to make the entry expand
@@ -375,13 +416,20 @@ def create_reference_join_section(app):
     join_container = ttk.Frame(join_frame)
     join_container.pack(padx=PAD_X, pady=PAD_Y, fill="x")
     
-    # Load reference file button
+    # Load reference file button + sheet selector
+    ref_row = ttk.Frame(join_container)
+    ref_row.pack(fill="x", pady=(0, PAD_Y))
+    
     load_ref_button = ttk.Button(
-        join_container,
+        ref_row,
         text="Load Reference File",
         command=app.load_reference_file
     )
-    load_ref_button.pack(anchor="w", pady=(0, PAD_Y))
+    load_ref_button.pack(side="left", padx=(0, PAD_X))
+    
+    ttk.Label(ref_row, text="Sheet:").pack(side="left", padx=FIELD_PAD)
+    app.ref_sheet_dropdown = ttk.Combobox(ref_row, state="readonly", width=20)
+    app.ref_sheet_dropdown.pack(side="left", padx=FIELD_PAD)
     
     # Create a two-column grid for the join parameters
     params_frame = ttk.Frame(join_container)
@@ -430,6 +478,7 @@ def create_reference_join_section(app):
     # Add tooltips if available
     if USE_ENHANCED_UI:
         app.theme.create_tooltip(load_ref_button, "Load a reference Excel file to join with the main data")
+        app.theme.create_tooltip(app.ref_sheet_dropdown, "Sheet of the reference file to join against")
         app.theme.create_tooltip(app.main_key_entry, "Column name in the main file to join on")
         app.theme.create_tooltip(app.ref_key_entry, "Column name in the reference file to join on")
         app.theme.create_tooltip(app.ref_cols_entry, "Comma-separated list of columns to include from the reference file")
@@ -462,6 +511,28 @@ def create_config_export_section(app):
     )
     load_config_btn.pack(side="left", padx=FIELD_PAD)
     
+    # Fail-fast: try every formula on a sample before the full evaluation
+    fail_fast_check = ttk.Checkbutton(
+        buttons_frame,
+        text="Check formulas first",
+        variable=app.fail_fast
+    )
+    fail_fast_check.pack(side="right")
+    if USE_ENHANCED_UI:
+        app.theme.create_tooltip(fail_fast_check, "Run each formula on a sample of rows and stop the export if any of them fail")
+    
+    # Fan-out: extra formats written next to the chosen export file
+    extra_formats_entry = ttk.Entry(
+        buttons_frame,
+        textvariable=app.extra_formats,
+        width=18
+    )
+    extra_formats_entry.pack(side="right", padx=FIELD_PAD)
+    extra_formats_entry.bind("<FocusOut>", app.save_extra_formats)
+    ttk.Label(buttons_frame, text="Also save as:").pack(side="right")
+    if USE_ENHANCED_UI:
+        app.theme.create_tooltip(extra_formats_entry, "Extra formats written from the same result, e.g. csv, parquet, feather, jsonl")
+    
     # Use TooltipButton if available, otherwise regular Button
     if USE_ENHANCED_UI and 'TooltipButton' in globals():
         export_button = TooltipButton(
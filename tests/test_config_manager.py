@@ -0,0 +1,25 @@
+import threading
+
+from gui.core import config_manager
+from gui.core.config_manager import get_setting, set_setting
+
+
+def test_concurrent_settings_writes_are_not_lost_or_torn():
+    errors = []
+
+    def writer(n):
+        try:
+            for i in range(50):
+                set_setting(f"key{n}", i)
+                get_setting("key0")
+        except Exception as exc:  # e.g. JSONDecodeError on a half-written file
+            errors.append(exc)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert config_manager._load_settings() == {f"key{n}": 49 for n in range(4)}
@@ -0,0 +1,20 @@
+import pandas as pd
+
+from gui.core.exporter import required_columns
+
+
+class _Var:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def test_required_columns_follows_formula_references():
+    sheet_columns = pd.Index(["id", "price", "qty", "note", "region"])
+    column_vars = {c: _Var(c in ("id", "total")) for c in [*sheet_columns, "total"]}
+    formula_vars = {"total": _Var("price * qty"), "note": _Var("")}
+    assert required_columns(sheet_columns, column_vars, formula_vars, "region") == [
+        "id", "price", "qty", "region",
+    ]
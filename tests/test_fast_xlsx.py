@@ -0,0 +1,38 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gui.core.fast_xlsx import read_xlsx
+from gui.core.readers import sample_frame
+
+
+@pytest.fixture(scope="module")
+def workbook(tmp_path_factory):
+    frame = sample_frame(2_000)
+    frame.loc[frame.index[::7], "price"] = np.nan
+    frame.loc[frame.index[::11], "region"] = None
+    frame.loc[frame.index[::13], "when"] = pd.NaT
+    frame["ok"] = frame["qty"] % 2 == 0
+    frame["code"] = [f"{i % 50:03d}" for i in range(len(frame))]
+    path = tmp_path_factory.mktemp("fast") / "sample.xlsx"
+    frame.to_excel(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {"nrows": 100},
+    {"usecols": ["price", "when", "code"]},
+    {"header": 5},
+])
+def test_read_xlsx_matches_read_excel(workbook, kwargs):
+    pandas_kwargs = dict(kwargs)
+    if "usecols" in kwargs:
+        wanted = set(kwargs["usecols"])
+        pandas_kwargs["usecols"] = lambda name: name in wanted
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)  # blank dates must not hit the casts
+        got = read_xlsx(workbook, **kwargs)
+    pd.testing.assert_frame_equal(got, pd.read_excel(workbook, **pandas_kwargs))
@@ -0,0 +1,244 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gui.core import formula_engine
+from gui.core.formula_engine import (
+    ROW_WISE, VECTORISED, ResultCache, compile_formula, evaluate_column, preview_formula, result_key,
+)
+from gui.core import formula_graph
+from gui.core.formula_graph import ColumnResults, FormulaProbeError
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "a": [1, 2, 3, 0],
+        "b": [0, 2, 5, 1],
+        "x": [1.5, -2.0, 0.0, np.nan],
+        "s": ["abcdef", "xy", "hello world", "q"],
+    })
+
+
+def pandas_eval(frame, formula):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return frame.eval(formula)
+
+
+@pytest.mark.parametrize("formula", [
+    "a + b * 2",
+    "a / b",
+    "x * 2 - a",
+    "a > 1 & b > 1",
+    "a > 1 | b > 3",
+    "(a > 1) & (b > 1)",
+    "a > 1 & b > 1 | a == 0",
+    "a > 1 and b > 1 & b < 5",
+    "~(a > 1) & (b > 0)",
+    "a & b",
+    "a | b",
+])
+def test_compiled_formula_matches_pandas_eval(frame, formula):
+    plan = compile_formula(formula)
+    assert plan.mode == VECTORISED
+    pd.testing.assert_series_equal(plan.evaluate(frame), pandas_eval(frame, formula), check_names=False)
+
+
+@pytest.mark.parametrize("formula", ["a // 0", "a % 0", "a // b", "a % b", "x // 0"])
+def test_integer_division_by_zero_matches_pandas_eval(frame, formula):
+    # with numexpr installed pandas.eval does integer // and % in NumPy (x // 0 == 0)
+    pytest.importorskip("numexpr")
+    values = compile_formula(formula).evaluate(frame)
+    pd.testing.assert_series_equal(values, pandas_eval(frame, formula), check_names=False)
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("a is None", [False] * 4),
+    ("a is not None", [True] * 4),
+])
+def test_unsupported_comparisons_fall_back_to_asteval(frame, formula, expected):
+    plan = compile_formula(formula)
+    assert plan.mode == ROW_WISE
+    values, path, reason, errors = evaluate_column(frame, formula)
+    assert path == ROW_WISE and errors is None
+    assert values.tolist() == expected
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("s.str[:4]", ["abcd", "xy", "hell", "q"]),
+    ("s.str[-2:].upper()", ["EF", "XY", "LD", "Q"]),
+    ("s.str.upper().str[0]", ["A", "X", "H", "Q"]),
+])
+def test_str_accessor_subscripts_are_vectorised(frame, formula, expected):
+    values, path, _, errors = evaluate_column(frame, formula)
+    assert path == VECTORISED and errors is None
+    assert values.tolist() == expected
+
+
+def test_rowwise_fallback_uses_pandas_grouping(frame):
+    # sum() over a generator is not vectorised, & must still bind like pandas.eval
+    formula = "sum([1 for _ in range(1)]) if a > 1 & b > 1 else 0"
+    values, path, _, _ = evaluate_column(frame, formula)
+    assert path == ROW_WISE
+    assert values.tolist() == [0, 1, 1, 0]
+
+
+@pytest.mark.parametrize("formula", ["Price.abs()", "Price.round(2)", "Price.clip(0)", "when.dt.year"])
+def test_series_methods_fall_back_to_pandas_eval(formula):
+    frame = pd.DataFrame({
+        "Price": [1.234, -2.5, 3.0],
+        "when": pd.to_datetime(["2024-01-01", "2023-05-02", "2022-12-31"]),
+    })
+    values, path, _, errors = evaluate_column(frame, formula)
+    assert path == VECTORISED and errors is None
+    pd.testing.assert_series_equal(values, frame.eval(formula), check_names=False)
+    assert preview_formula(frame, formula).startswith(f"Preview ({VECTORISED}): ")
+
+
+def test_rowwise_pool_is_reused_across_columns(monkeypatch):
+    monkeypatch.setattr(formula_engine, "ROW_WISE_PARALLEL_MIN_ROWS", 4)
+    frame = pd.DataFrame({"a": range(8)})
+    formula = "sum([a for _ in range(2)])"
+
+    first, errors = formula_engine.evaluate_rowwise(frame, formula, workers=2)
+    pool = formula_engine.rowwise_pool(2)
+    second, _ = formula_engine.evaluate_rowwise(frame, formula + " + 1", workers=2)
+
+    assert errors is None and first.tolist() == [2 * a for a in range(8)]
+    assert second.tolist() == [2 * a + 1 for a in range(8)]
+    assert formula_engine.rowwise_pool(2) is pool
+
+
+@pytest.mark.parametrize("formula", ["a * 3", "a * 2 + x", "a // 2 + x", "a % 7 - 1", "(x > 0.5) & (a > 3)"])
+def test_chunked_evaluation_matches_single_threaded(monkeypatch, formula):
+    monkeypatch.setattr(formula_engine, "PARALLEL_MIN_ROWS", 1_000)
+    monkeypatch.setattr(formula_engine, "MIN_CHUNK_ROWS", 250)
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({"a": rng.integers(0, 100, 1_000), "x": rng.random(1_000)})
+    threads = formula_engine.numexpr.get_num_threads() if formula_engine.HAVE_NUMEXPR else None
+
+    single, *_ = evaluate_column(frame, formula, workers=1)
+    chunked, path, _, errors = evaluate_column(frame, formula, workers=4)
+
+    assert path == VECTORISED and errors is None
+    pd.testing.assert_series_equal(chunked, single, check_names=False)  # values, dtype and index
+    if threads is not None:
+        assert formula_engine.numexpr.get_num_threads() == threads
+
+
+@pytest.mark.parametrize("formula", ["1 / x", "1 /", "missing + x", "sum([x for _ in range(2)])"])
+def test_rowwise_public_asteval_path_matches_internals(monkeypatch, formula):
+    frame = pd.DataFrame({"x": [1, 0, "a", None]})
+    fast, fast_errors = formula_engine.RowEvaluator(formula).values(frame)
+    monkeypatch.setattr(formula_engine, "ASTEVAL_INTERNALS", False)
+    public, public_errors = formula_engine.RowEvaluator(formula).values(frame)
+
+    assert public == fast
+    assert public_errors.summary == fast_errors.summary
+
+
+def test_common_subexpressions_are_computed_once(frame):
+    formulas = {"p": "a * b + 1", "q": "(a * b) * 2", "r": "x * b"}
+    results = ColumnResults(frame, cache=None, workers=1)
+    computed = results.evaluate(formulas, list(formulas))
+
+    assert results.cse.hits == 1  # a * b: computed for p, reused for q
+    for col, formula in formulas.items():
+        pd.testing.assert_series_equal(computed[col][0], pandas_eval(frame, formula), check_names=False)
+
+
+def test_subexpressions_are_not_shared_across_different_data(frame):
+    # "a * 2" reads the source column a in formula a, the computed column a in q
+    formulas = {"a": "a * 2", "q": "a * 2 + 0"}
+    results = ColumnResults(frame, cache=None, workers=1)
+    computed = results.evaluate(formulas, ["a", "q"])
+
+    assert results.cse.hits == 0
+    assert computed["a"][0].tolist() == (frame["a"] * 2).tolist()
+    assert computed["q"][0].tolist() == (frame["a"] * 4).tolist()
+
+
+def test_result_key_follows_data_not_frame_identity(frame):
+    key = result_key("a + b", frame)
+
+    assert result_key("a+b", frame.copy()) == key  # same data, same normalised formula
+    changed = frame.copy()
+    changed.loc[changed.index[2], "b"] = 99
+    assert result_key("a + b", changed) != key
+    assert result_key("a + b", frame.assign(x=0.0)) == key  # unread columns do not count
+
+
+def test_result_cache_hit_and_invalidation(frame):
+    cache = ResultCache(1024 ** 2)
+    formulas = {"p": "a * b"}
+    ColumnResults(frame, cache=cache, workers=1).evaluate(formulas, ["p"])
+
+    again = ColumnResults(frame.copy(), cache=cache, workers=1)
+    again.evaluate(formulas, ["p"])
+    assert again.reused == ["p"] and again.recomputed == []
+
+    changed = frame.copy()
+    changed["b"] = changed["b"] + 1
+    fresh = ColumnResults(changed, cache=cache, workers=1)
+    values = fresh.evaluate(formulas, ["p"])["p"][0]
+    assert fresh.recomputed == ["p"]
+    assert values.tolist() == (changed["a"] * changed["b"]).tolist()
+
+
+def test_result_cache_evicts_least_recently_used_by_bytes():
+    column = pd.Series(np.arange(100, dtype="int64"))  # 800 bytes
+    cache = ResultCache(2_000)
+    cache.put("one", column, VECTORISED, "")
+    cache.put("two", column, VECTORISED, "")
+    assert cache.get("one") is not None  # now the most recently used
+    cache.put("three", column, VECTORISED, "")
+
+    assert "two" not in cache and "one" in cache and "three" in cache
+    assert cache.stats()["evictions"] == 1 and cache.bytes_used == 1_600
+    cache.put("huge", pd.Series(np.arange(1_000, dtype="int64")), VECTORISED, "")
+    assert "huge" not in cache  # larger than the whole budget: not cached
+
+
+@pytest.fixture
+def codes():
+    # every seventh code is not a number; int() fails on those rows only
+    return pd.DataFrame({"s": [("x" if i % 7 == 3 else str(i)) for i in range(40)]})
+
+
+def test_failed_rows_are_masked_and_the_rest_stay_typed(codes, monkeypatch):
+    monkeypatch.setattr(formula_engine, "ROW_WISE_PARTITION_ROWS", 6)  # several partitions
+    partitions = []
+    values, path, _, errors = evaluate_column(
+        codes, "int(s) * 2", progress=lambda done, total: partitions.append(total),
+    )
+    bad = [i for i in range(40) if i % 7 == 3]
+
+    assert path == ROW_WISE and partitions[-1] > 1
+    assert errors.positions == bad
+    assert errors.mask.tolist() == [i in bad for i in range(40)]
+    assert values.dtype == "float64" and values[errors.mask].isna().all()
+    assert values[~errors.mask].tolist() == [2.0 * i for i in range(40) if i not in bad]
+    count, rows, _ = errors.summary["ValueError"]
+    assert count == len(bad) and rows == bad[:formula_engine.ERROR_SAMPLE_ROWS]
+
+
+def test_fail_fast_stops_before_the_full_frame(codes, monkeypatch):
+    monkeypatch.setattr(formula_graph, "PROBE_ROWS", 20)
+    evaluated = []
+    real = formula_graph.evaluate_column
+    monkeypatch.setattr(formula_graph, "evaluate_column",
+                        lambda df, *args, **kwargs: evaluated.append(len(df)) or real(df, *args, **kwargs))
+    results = ColumnResults(codes, cache=None, workers=1, fail_fast=True)
+
+    with pytest.raises(FormulaProbeError) as caught:
+        results.evaluate({"n": "int(s) * 2", "ok": "s + '!'"}, ["n", "ok"])
+
+    assert list(caught.value.failures) == ["n"]
+    assert evaluated == [20, 20]  # only the probe rows were evaluated
+    assert results.entries == {}
+
+    computed = results.evaluate({"ok": "s + '!'"}, ["ok"])
+    assert computed["ok"][3] is None and evaluated[-1] == 40
@@ -0,0 +1,78 @@
+import datetime as dt
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from gui.core import readers
+from gui.core.loader import frame_from_grid
+from gui.core.workbook_cache import WorkbookCache
+
+BACKENDS = [b.name for b in readers.available_backends(".xlsx")]
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["title row", None, None, None, None])
+    ws.append(["code", "n", "when", "flag", "mixed"])
+    ws.append(["001", 1, dt.datetime(2024, 1, 1), True, "x"])
+    ws.append(["002", None, dt.datetime(2024, 1, 2), False, 3])
+    ws.append(["NA", 2.5, None, True, "4"])
+    ws.append(["010", 3, dt.datetime(2024, 1, 3), None, None])
+    path = tmp_path / "types.xlsx"
+    wb.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("header", [0, 1])
+def test_every_read_path_matches_read_excel(workbook, backend, header):
+    expected = pd.read_excel(workbook, header=header)
+    reader = readers.get_backend(backend)
+    grid = reader.read(workbook, 0, header=None)
+    pd.testing.assert_frame_equal(reader.read(workbook, 0, header=header), expected)
+    pd.testing.assert_frame_equal(frame_from_grid(grid, header), expected)
+    pd.testing.assert_frame_equal(
+        reader.read(workbook, 0, header=header, nrows=2), pd.read_excel(workbook, header=header, nrows=2)
+    )
+
+
+def test_cached_paths_agree_on_dtypes(workbook):
+    cache = WorkbookCache()
+    sheet = cache.sheet_names(workbook)[0]
+    probe, _ = cache.probe_sheet(workbook, sheet, 1)
+    projected = cache.load_columns(workbook, sheet, 1, ["code", "when"])  # file re-read
+    full = cache.load_sheet(workbook, sheet, 1)  # grid parsed and re-sliced
+    resliced = cache.load_columns(workbook, sheet, 1, ["code", "when"])
+
+    assert full["code"].tolist()[:2] == [1, 2]
+    assert probe.dtypes.equals(full.dtypes)
+    assert projected.dtypes.equals(full.dtypes[["code", "when"]])
+    assert resliced.dtypes.equals(projected.dtypes)
+
+
+def test_concurrent_tasks_get_their_own_workbook_handle(workbook):
+    cache = WorkbookCache()
+    with cache._book(workbook) as first, cache._book(workbook) as second:
+        assert first is not second
+    with cache._book(workbook) as again:
+        assert again in (first, second)  # idle handles are reused
+    cache.clear()
+
+
+def test_prefetch_never_evicts_the_open_sheet(tmp_path):
+    path = str(tmp_path / "three.xlsx")
+    with pd.ExcelWriter(path) as writer:
+        for name in "ABC":
+            pd.DataFrame({"x": range(200), "y": [name] * 200}).to_excel(writer, sheet_name=name, index=False)
+    cache = WorkbookCache()
+    cache.load_sheet(path, "A", 0)
+    cache.max_bytes = int(cache.bytes_used * 2.5)
+
+    timings = cache.prefetch(path, ["B", "C"], max_workers=1)
+
+    assert [key[-1] for key in cache._grids] == ["B", "A"]
+    assert list(timings) == ["B"]  # C did not fit, so it was not kept
+    cache.clear()
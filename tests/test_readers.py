@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from gui.core.readers import read_sheet
+
+ROWS = [
+    "day,stamp,amount,code,flag,mixed",
+    "2024-01-01,2024-01-01 10:00:00,1,001,true,x",
+    "2024-01-02,2024-01-02T11:00,2.5,NA,False,3",
+    ",,,,,",
+]
+
+
+@pytest.mark.parametrize("ext, sep", [(".csv", ","), (".tsv", "\t")])
+def test_delimited_sample_and_full_read_agree(tmp_path, ext, sep):
+    path = tmp_path / f"data{ext}"
+    path.write_text("\n".join(row.replace(",", sep) for row in ROWS) + "\n", encoding="utf-8")
+
+    full = read_sheet(str(path), None)
+    sample = read_sheet(str(path), None, nrows=10)
+
+    pd.testing.assert_frame_equal(full, sample)
+    assert full["day"].tolist()[:2] == ["2024-01-01", "2024-01-02"]  # text, not datetime.date
+    assert full["stamp"].tolist()[1] == "2024-01-02T11:00"
+
+
+@pytest.mark.parametrize("sep", [";", "|", "\t", ","])
+def test_txt_separator_is_sniffed_for_sample_and_full_read(tmp_path, sep):
+    path = tmp_path / "data.txt"
+    path.write_text(sep.join("abc") + "\n" + sep.join(["1", "2", "x"]) + "\n", encoding="utf-8")
+
+    full = read_sheet(str(path), None)
+    sample = read_sheet(str(path), None, nrows=1)
+
+    assert list(full.columns) == list(sample.columns) == ["a", "b", "c"]
+    pd.testing.assert_frame_equal(full, sample)
+
+
+def test_feather_usecols(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "data.feather"
+    pd.DataFrame({"a": [1, 2], "b": ["x", "y"], "c": [0.5, 1.5]}).to_feather(path)
+
+    df = read_sheet(str(path), None, usecols=["c", "a", "missing"])
+
+    assert list(df.columns) == ["a", "c"]
+    assert df["c"].tolist() == [0.5, 1.5]
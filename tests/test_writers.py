@@ -0,0 +1,154 @@
+import json
+import os
+import zipfile
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gui.core import parallel_xlsx, writers
+from gui.core.config_manager import set_setting
+from gui.core.readers import sample_frame
+
+
+@pytest.fixture
+def frame():
+    frame = sample_frame(3_000)
+    frame.loc[frame.index[::7], "price"] = np.nan
+    frame.loc[frame.index[::11], "region"] = None
+    frame["ok"] = frame["qty"] % 2 == 0
+    frame["delta"] = frame["qty"] - 25
+    return frame
+
+
+@pytest.fixture
+def expected(frame, tmp_path):
+    path = tmp_path / "to_excel.xlsx"
+    frame.to_excel(path, index=False)
+    return pd.read_excel(path)
+
+
+@pytest.mark.parametrize("backend", [b.name for b in writers.available_backends(".xlsx")])
+def test_xlsx_backends_match_to_excel(frame, expected, tmp_path, backend):
+    path = str(tmp_path / f"{backend}.xlsx")
+    stats = writers.write_frame(frame, path, backend=writers.get_backend(backend))
+    assert stats["rows"] == len(frame) and stats["files"] == [path]
+    assert zipfile.ZipFile(path).testzip() is None
+    pd.testing.assert_frame_equal(pd.read_excel(path), expected)
+
+
+def test_parallel_xlsx_parts_on_a_process_pool(frame, expected, tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel_xlsx, "PART_ROWS", 700)  # several deflate streams per sheet
+    path = str(tmp_path / "pool.xlsx")
+    seen = []
+    parallel_xlsx.write_workbook(
+        [("first", frame.iloc[:1_800]), ("second", frame.iloc[1_800:])], path,
+        progress=lambda done, total: seen.append((done, total)), workers=2,
+    )
+    sheets = pd.read_excel(path, sheet_name=None)
+    assert list(sheets) == ["first", "second"]
+    pd.testing.assert_frame_equal(pd.concat(sheets.values(), ignore_index=True), expected)
+    assert seen[-1] == (len(frame), len(frame))
+
+
+def test_zip_crcs(frame, tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel_xlsx, "PART_ROWS", 500)
+    path = str(tmp_path / "crc.xlsx")
+    parallel_xlsx.write_xlsx(frame, path, workers=1)
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            assert zlib.crc32(zf.read(info)) == info.CRC, info.filename
+
+
+def test_crc32_combine_matches_zlib():
+    rng = np.random.default_rng(1)
+    for size in (0, 1, 7, 1_000, 65_537):
+        a, b = rng.bytes(int(rng.integers(0, 5_000))), rng.bytes(size)
+        combined = parallel_xlsx.crc32_combine(zlib.crc32(a), zlib.crc32(b), len(b))
+        assert combined == zlib.crc32(a + b)
+
+
+def test_zip64_records(frame, expected, tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel_xlsx, "ZIP64_LIMIT", 50)  # every size and offset needs ZIP64
+    path = str(tmp_path / "zip64.xlsx")
+    parallel_xlsx.write_xlsx(frame, path, workers=1)
+    assert zipfile.ZipFile(path).testzip() is None
+    pd.testing.assert_frame_equal(pd.read_excel(path), expected)
+
+
+@pytest.mark.parametrize("ext", [".csv", ".tsv"])
+def test_default_csv_writer_matches_to_csv(frame, tmp_path, ext):
+    frame.loc[frame.index[3], "label"] = 'comma, "quote"'
+    path = str(tmp_path / f"out{ext}")
+    writers.write_frame(frame, path)
+    expected = frame.to_csv(sep=writers.DELIMITERS[ext], index=False)
+    with open(path, encoding="utf-8", newline="") as fp:
+        assert fp.read() == expected
+
+
+@pytest.mark.parametrize("ext", [".csv", ".tsv", ".jsonl", ".parquet", ".feather"])
+def test_other_formats_round_trip(frame, tmp_path, ext):
+    if ext in (".parquet", ".feather"):
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"out{ext}")
+    writers.write_frame(frame, path)
+    if ext == ".parquet":
+        back = pd.read_parquet(path)
+    elif ext == ".feather":
+        back = pd.read_feather(path)
+    elif ext == ".jsonl":
+        back = pd.read_json(path, lines=True, convert_dates=["when"])
+    else:
+        back = pd.read_csv(path, sep=writers.DELIMITERS[ext], parse_dates=["when"])
+    assert len(back) == len(frame) and list(back.columns) == list(frame.columns)
+    pd.testing.assert_series_equal(back["price"], frame["price"], check_dtype=False)
+    assert back["region"].isna().sum() == frame["region"].isna().sum()
+    assert (pd.to_datetime(back["when"]).to_numpy() == frame["when"].to_numpy()).all()
+
+
+@pytest.mark.parametrize("backend", [b.name for b in writers.available_backends(".xlsx")])
+@pytest.mark.parametrize("mode", ["sheets", "files"])
+def test_oversized_output_is_sharded_with_a_manifest(frame, expected, tmp_path, monkeypatch, backend, mode):
+    monkeypatch.setattr(writers.get_backend(backend), "max_rows", 1_000)
+    set_setting(writers.SETTINGS_KEY, {".xlsx": backend})
+    set_setting(writers.SHARD_MODE_KEY, mode)
+    path = str(tmp_path / "big.xlsx")
+
+    stats = writers.write_frame(frame, path)
+
+    with open(stats["manifest"], encoding="utf-8") as fp:
+        manifest = json.load(fp)
+    assert manifest["rows"] == len(frame) and manifest["mode"] == mode
+    shards = manifest["shards"]
+    assert [(s["first_row"], s["last_row"], s["rows"]) for s in shards] == [
+        (1, 1_000, 1_000), (1_001, 2_000, 1_000), (2_001, 3_000, 1_000),
+    ]
+    if mode == "sheets":
+        assert {s["file"] for s in shards} == {"big.xlsx"} and stats["files"] == [path]
+    else:
+        assert [s["file"] for s in shards] == [f"big_part00{n}.xlsx" for n in (1, 2, 3)]
+        assert not os.path.exists(path)
+    parts = [pd.read_excel(tmp_path / s["file"], sheet_name=s["sheet"]) for s in shards]
+    pd.testing.assert_frame_equal(pd.concat(parts, ignore_index=True), expected)
+
+
+def test_too_many_columns_is_an_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(writers.get_backend("parallel-xlsx"), "max_cols", 3)
+    set_setting(writers.SETTINGS_KEY, {".xlsx": "parallel-xlsx"})
+    with pytest.raises(ValueError, match="columns"):
+        writers.write_frame(pd.DataFrame([[0] * 5]), str(tmp_path / "wide.xlsx"))
+    assert not os.path.exists(tmp_path / "wide.xlsx")
+
+
+def test_concurrent_writes_share_one_render_pool(frame, expected, tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel_xlsx, "PART_ROWS", 700)
+    paths = [str(tmp_path / f"target{n}.xlsx") for n in range(3)]
+    writers.run_concurrently(
+        [(lambda report, path=path: parallel_xlsx.write_xlsx(frame, path, report, workers=2), len(frame))
+         for path in paths],
+    )
+    assert list(parallel_xlsx._pools) == [2]
+    assert parallel_xlsx._pools[2]._max_workers == 2
+    for path in paths:
+        pd.testing.assert_frame_equal(pd.read_excel(path), expected)